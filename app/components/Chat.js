@@ -144,7 +144,8 @@ export default function Chat({
             </AnimatePresence>
 
             <AnimatePresence>
-              {isChatLoading && (
+              {isChatLoading &&
+                chatHistory[chatHistory.length - 1]?.role !== "assistant" && (
                 <motion.div
                   key="loading"
                   className="flex justify-start w-full"
@@ -16,6 +16,7 @@ import {
   getReportStatus,
   transcribeAudio,
   sendChatMessage,
+  streamChatMessage,
 } from "./utils/api";
 
 export default function Submission() {
@@ -166,6 +167,22 @@ export default function Submission() {
     setChatHistory((prev) => [...prev, { role: "user", content: message }]);
 
     try {
+      if (hasSubscription && currentTaskId) {
+        // The server keeps this report's conversation; render the reply as it streams in
+        let started = false;
+        await streamChatMessage(message, currentTaskId, (_delta, reply) => {
+          const assistantMessage = { role: "assistant", content: reply };
+          const replaceLast = started;
+          started = true;
+          setChatHistory((prevChat) =>
+            replaceLast
+              ? [...prevChat.slice(0, -1), assistantMessage]
+              : [...prevChat, assistantMessage],
+          );
+        });
+        return;
+      }
+
       let contextToSend;
 
       if (chatHistory.length === 0) {
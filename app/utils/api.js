@@ -198,16 +198,29 @@ export async function createReport(bucketName, fileName) {
   return response.json();
 }
 
+const reportStatusCache = new Map();
+
 export async function getReportStatus(taskId, hasSubscription = false) {
+  const cached = reportStatusCache.get(taskId);
   const response = await fetchWithAuth(
     `/report-status/${taskId}?has_subscription=${hasSubscription}`,
+    cached ? { headers: { "If-None-Match": cached.etag } } : {},
   );
 
+  if (response.status === 304 && cached) {
+    return cached.body;
+  }
+
   if (!response.ok) {
     throw new Error(`Failed to get report status: ${response.status}`);
   }
 
-  return response.json();
+  const body = await response.json();
+  const etag = response.headers.get("ETag");
+  if (etag) {
+    reportStatusCache.set(taskId, { etag, body });
+  }
+  return body;
 }
 
 export async function transcribeAudio(file, hasSubscription = false) {
@@ -261,6 +274,52 @@ export async function sendChatMessage(
   return response.json();
 }
 
+export async function streamChatMessage(message, taskId, onDelta) {
+  const response = await fetchWithAuth(`/chat/stream?task_id=${taskId}`, {
+    method: "POST",
+    body: JSON.stringify({ message }),
+  });
+
+  if (!response.ok) {
+    throw new Error(`Chat request failed: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let reply = "";
+  let usage = null;
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const events = buffer.split("\n\n");
+    buffer = events.pop();
+    for (const rawEvent of events) {
+      const lines = rawEvent.split("\n");
+      const eventType = lines
+        .find((line) => line.startsWith("event: "))
+        ?.slice(7);
+      const dataLine = lines.find((line) => line.startsWith("data: "));
+      if (!dataLine) continue;
+      const data = JSON.parse(dataLine.slice(6));
+
+      if (eventType === "error") {
+        throw new Error(data.error || "Chat failed");
+      } else if (eventType === "done") {
+        usage = data;
+      } else if (data.delta) {
+        reply += data.delta;
+        onDelta?.(data.delta, reply);
+      }
+    }
+  }
+
+  return { response: reply, usage };
+}
+
 export async function getChatUsage(taskId) {
   if (!taskId) {
     return { message_count: 0, limit: 10, remaining: 10 };
@@ -0,0 +1,229 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def estimate_audio_seconds(size_bytes: int, file_name: str) -> float:
+    """Rough duration from file size alone: 16-bit mono 44.1 kHz for WAV, 128 kbps otherwise"""
+    if file_name.lower().endswith(".wav"):
+        return max(0.0, size_bytes - 44) / (44100 * 2)
+    return size_bytes / (128000 / 8)
+
+
+class AdmissionTicket:
+    def __init__(self, audio_seconds: float, estimated_seconds: float, lane: str):
+        self.audio_seconds = audio_seconds
+        self.estimated_seconds = estimated_seconds
+        self.lane = lane
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+
+
+class AdmissionReservation:
+    """
+    A place in the admission bound taken by reserve() for a job that reaches slot() only after other awaits
+    (upload, download, transcription). slot(reservation=...) consumes it; release() is idempotent, so error
+    paths can always call it.
+    """
+
+    def __init__(self, controller: "AdmissionController", estimated_seconds: float):
+        self.controller = controller
+        self.estimated_seconds = estimated_seconds
+        self.held = True
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self.controller.reserved -= 1
+            self.controller.outstanding_work_seconds = max(
+                0.0, self.controller.outstanding_work_seconds - self.estimated_seconds
+            )
+
+
+class LaneStats:
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.waiters = deque()
+        self.pass_value = 0.0
+        self.admitted_total = 0
+        self.recent_waits = deque(maxlen=500)
+
+    def metrics(self) -> Dict:
+        waits = sorted(self.recent_waits)
+        return {
+            "weight": self.weight,
+            "queue_depth": len(self.waiters),
+            "admitted_total": self.admitted_total,
+            "wait_p50_seconds": round(waits[len(waits) // 2], 3) if waits else 0.0,
+            "wait_p95_seconds": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0
+        }
+
+
+class AdmissionController:
+    """
+    Global gate in front of CPU-bound analysis: at most max_concurrent jobs run, at most max_queue wait,
+    and a job whose estimated wait exceeds max_wait_seconds is refused up front with a Retry-After hint.
+    Wait estimates use the audio duration and a moving average of processing seconds per audio second.
+    Jobs admitted with reserve() count against the bounds from that moment, so a burst of requests cannot
+    all pass admission before any of them reaches the queue.
+
+    Waiting jobs sit in weighted lanes (e.g. pro/free). Freed slots go to the lane with the lowest
+    stride pass value, so higher-weight lanes are served more often but no lane starves.
+    """
+
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 8, max_wait_seconds: float = 240.0,
+                 initial_seconds_per_audio_second: float = 0.05, lane_weights: Optional[Dict[str, float]] = None):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.seconds_per_audio_second = initial_seconds_per_audio_second
+        self.lanes = {name: LaneStats(weight) for name, weight in (lane_weights or {"pro": 3, "free": 1}).items()}
+        self.default_lane = list(self.lanes)[-1]
+        self.active = 0
+        self.reserved = 0
+        self.outstanding_work_seconds = 0.0
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self.rejections_by_reason: Dict[str, int] = {}
+        self.total_wait_seconds = 0.0
+
+    @classmethod
+    def from_env(cls, prefix: str = 'ADMISSION', max_concurrent: int = 2, max_queue: int = 8, max_wait_seconds: float = 240):
+        return cls(
+            max_concurrent=int(os.getenv(f'{prefix}_MAX_CONCURRENT', str(max_concurrent))),
+            max_queue=int(os.getenv(f'{prefix}_MAX_QUEUE', str(max_queue))),
+            max_wait_seconds=float(os.getenv(f'{prefix}_MAX_WAIT_SECONDS', str(max_wait_seconds))),
+            lane_weights={
+                "pro": float(os.getenv('PRIORITY_PRO_WEIGHT', '3')),
+                "free": float(os.getenv('PRIORITY_FREE_WEIGHT', '1'))
+            }
+        )
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(lane.waiters) for lane in self.lanes.values())
+
+    def estimated_wait(self) -> float:
+        return self.outstanding_work_seconds / self.max_concurrent
+
+    def _reject(self, reason: str, retry_after: float):
+        self.rejected_total += 1
+        self.rejections_by_reason[reason] = self.rejections_by_reason.get(reason, 0) + 1
+        raise AdmissionRejected(reason, max(1, math.ceil(retry_after)))
+
+    def check(self):
+        """Raise AdmissionRejected if a job arriving now would be refused"""
+        pending = self.active + self.waiting + self.reserved
+        wait = self.estimated_wait() if pending >= self.max_concurrent else 0.0
+        if pending >= self.max_concurrent + self.max_queue:
+            self._reject("queue_full", wait)
+        if wait > self.max_wait_seconds:
+            self._reject("wait_too_long", wait - self.max_wait_seconds)
+
+    def reserve(self, audio_seconds: float = 0.0) -> AdmissionReservation:
+        """check() and take a place in one step (no await in between); raises AdmissionRejected"""
+        self.check()
+        reservation = AdmissionReservation(self, audio_seconds * self.seconds_per_audio_second)
+        self.reserved += 1
+        self.outstanding_work_seconds += reservation.estimated_seconds
+        return reservation
+
+    def _dispatch(self):
+        while self.active < self.max_concurrent:
+            ready = [lane for lane in self.lanes.values() if lane.waiters]
+            if not ready:
+                return
+            lane = min(ready, key=lambda l: l.pass_value)
+            lane.pass_value += 1.0 / lane.weight
+            future = lane.waiters.popleft()
+            if future.done():
+                continue
+            self.active += 1
+            future.set_result(None)
+
+    async def acquire(self, audio_seconds: float, reject: bool = True, lane: Optional[str] = None,
+                      reservation: Optional[AdmissionReservation] = None) -> AdmissionTicket:
+        if reservation is not None:
+            # Already admitted; the reservation turns into the queue entry below without a gap
+            reservation.release()
+        elif reject:
+            self.check()
+        lane = lane if lane in self.lanes else self.default_lane
+        lane_stats = self.lanes[lane]
+        estimated_seconds = audio_seconds * self.seconds_per_audio_second
+        ticket = AdmissionTicket(audio_seconds, estimated_seconds, lane)
+        self.outstanding_work_seconds += estimated_seconds
+
+        if self.active < self.max_concurrent and not self.waiting:
+            self.active += 1
+        else:
+            # A lane returning from idle must not bank credit from the time it had no waiters
+            if not lane_stats.waiters:
+                busy = [l.pass_value for l in self.lanes.values() if l.waiters]
+                if busy:
+                    lane_stats.pass_value = max(lane_stats.pass_value, min(busy))
+            future = asyncio.get_running_loop().create_future()
+            lane_stats.waiters.append(future)
+            try:
+                await future
+            except BaseException:
+                self.outstanding_work_seconds -= estimated_seconds
+                if future.done() and not future.cancelled():
+                    self.active -= 1
+                    self._dispatch()
+                elif future in lane_stats.waiters:
+                    lane_stats.waiters.remove(future)
+                raise
+
+        ticket.started_at = time.monotonic()
+        waited = ticket.started_at - ticket.enqueued_at
+        self.admitted_total += 1
+        self.total_wait_seconds += waited
+        lane_stats.admitted_total += 1
+        lane_stats.recent_waits.append(waited)
+        return ticket
+
+    def release(self, ticket: AdmissionTicket):
+        elapsed = time.monotonic() - ticket.started_at
+        if ticket.audio_seconds > 0:
+            observed = elapsed / ticket.audio_seconds
+            self.seconds_per_audio_second = 0.8 * self.seconds_per_audio_second + 0.2 * observed
+        self.outstanding_work_seconds = max(0.0, self.outstanding_work_seconds - ticket.estimated_seconds)
+        self.active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, audio_seconds: float, reject: bool = True, lane: Optional[str] = None,
+                   reservation: Optional[AdmissionReservation] = None):
+        ticket = await self.acquire(audio_seconds, reject, lane, reservation)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def metrics(self) -> Dict:
+        return {
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "reserved": self.reserved,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "estimated_wait_seconds": round(self.estimated_wait(), 2),
+            "seconds_per_audio_second": round(self.seconds_per_audio_second, 4),
+            "admitted_total": self.admitted_total,
+            "rejected_total": self.rejected_total,
+            "rejections_by_reason": dict(self.rejections_by_reason),
+            "average_wait_seconds": round(self.total_wait_seconds / self.admitted_total, 3) if self.admitted_total else 0.0,
+            "lanes": {name: lane.metrics() for name, lane in self.lanes.items()}
+        }
@@ -1,19 +1,33 @@
-from fastapi import FastAPI, UploadFile, HTTPException, Request, Depends, status, Header
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, HTTPException, Request, Depends, status, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, Response
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import uuid
 import os
 from dotenv import load_dotenv
 import asyncio
-from audio_processor import AudioInference
+from audio_processor import AudioInference, EnsembleInference
+from live_inference import LiveAudioSession, LiveInferenceBatcher, LiveOverloaded
+from feature_store import FeatureStore
+from fingerprint import FingerprintIndex
+from model_registry import ModelRegistry
+from admission import AdmissionController, AdmissionRejected, estimate_audio_seconds
+from audio_probe import probe_audio_bytes, probe_audio_file
+from upload_validation import validate_blob, validate_blobs, LocalBlobStore
+from gcs_transfer import configure_connection_pool, download_blob_async, download_stats
+from chat_context import ChatContextBuilder
+from timeline_codec import encode_timeline, job_timeline
+from fast_json import json_response
+from transcript_index import TranscriptIndex, build_attribution, limit_utterance_text
+from speaker_scores import score_speakers
 import tempfile
 from google.cloud import storage, tasks_v2
 import json
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List, Dict, Set
 from datetime import datetime, timezone, timedelta
-import random
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from google.generativeai import GenerativeModel
 import google.generativeai as genai
 import traceback
@@ -26,7 +40,6 @@ import hmac
 import hashlib
 import time
 import base64
-import magic
 from starlette.middleware.base import BaseHTTPMiddleware
 import logging
 
@@ -65,12 +78,15 @@ SECURITY_CONFIG = {
     "upload_limits": {
         "max_file_size": 40 * 1024 * 1024,
         "allowed_types": ["audio/mpeg", "audio/mp3", "audio/wav", "audio/x-wav"],
-        "allowed_extensions": [".mp3", ".wav", ".m4a"]
+        "allowed_extensions": [".mp3", ".wav", ".m4a"],
+        "max_batch_files": 200,
+        "max_duration_seconds": int(os.getenv('MAX_AUDIO_SECONDS', '7200'))
     },
     "cors": {
         "allowed_origins": os.getenv('ALLOWED_ORIGINS', 'http://localhost:3000').split(','),
         "allowed_methods": ["GET", "POST", "OPTIONS"],
-        "allowed_headers": ["Authorization", "Content-Type"],
+        "allowed_headers": ["Authorization", "Content-Type", "If-None-Match"],
+        "expose_headers": ["ETag", "Retry-After"],
         "max_age": 86400
     },
     "csp": "default-src 'self'; script-src 'self'; connect-src 'self' https://api.deepgram.com https://generativelanguage.googleapis.com; img-src 'self' data:; style-src 'self' 'unsafe-inline'; font-src 'self'; object-src 'none'; base-uri 'self'; form-action 'self';"
@@ -154,18 +170,124 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=SECURITY_CONFIG["cors"]["allowed_methods"],
     allow_headers=SECURITY_CONFIG["cors"]["allowed_headers"],
+    expose_headers=SECURITY_CONFIG["cors"]["expose_headers"],
     max_age=SECURITY_CONFIG["cors"]["max_age"],
 )
 
-storage_client = storage.Client()
+# LOCAL_BLOB_STORE_DIR swaps GCS for a directory-backed store (local runs and tests)
+storage_client = LocalBlobStore(os.getenv('LOCAL_BLOB_STORE_DIR')) if os.getenv('LOCAL_BLOB_STORE_DIR') else storage.Client()
+configure_connection_pool(storage_client, int(os.getenv('GCS_CONNECTION_POOL_SIZE', '32')))
 tasks_client = tasks_v2.CloudTasksClient()
 project = os.getenv('GOOGLE_CLOUD_PROJECT')
 queue = os.getenv('CLOUD_TASKS_QUEUE')
 location = os.getenv('CLOUD_TASKS_LOCATION')
 bucket_name = os.getenv('GCS_BUCKET_NAME')
 jobs = defaultdict(dict)
+# Bumped on every change to a report job; /report-status derives ETags from it and long-polls on it.
+# Entries exist only for task_ids in jobs and are dropped with the job (forget_job)
+job_versions: Dict[str, int] = {}
+job_changed: Dict[str, asyncio.Event] = {}
+transcript_indexes: Dict[str, tuple] = {}
+MAX_STATUS_WAIT_SECONDS = 25
+# Transcript characters non-subscribers see (/report-status text, /report-segments utterances)
+LIMITED_TRANSCRIPT_CHARS = 200
+
+def touch_job(task_id):
+    if task_id not in jobs:
+        return
+    job_versions[task_id] = job_versions.get(task_id, 0) + 1
+    event = job_changed.pop(task_id, None)
+    if event:
+        event.set()
+
+async def wait_for_job_change(task_id, version, timeout):
+    if task_id not in jobs:
+        # Unknown ids keep the long-poll pacing but get no version or Event entry
+        await asyncio.sleep(timeout)
+        return
+    if job_versions.get(task_id, 0) != version:
+        return
+    event = job_changed.setdefault(task_id, asyncio.Event())
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+def forget_job(task_id):
+    """Drop a job and everything keyed by its task_id; pending long-polls return at once"""
+    jobs.pop(task_id, None)
+    job_versions.pop(task_id, None)
+    transcript_indexes.pop(task_id, None)
+    event = job_changed.pop(task_id, None)
+    if event:
+        event.set()
 deepgram = DeepgramClient(api_key=os.getenv('DEEPGRAM_API_KEY'))
 genai.configure(api_key=os.getenv('GOOGLE_AI_API_KEY'))
+chat_model = GenerativeModel('gemini-1.5-pro-002')
+CHAT_MESSAGE_LIMIT = 10
+chat_context_builder = ChatContextBuilder(INITIAL_CHAT_CONTEXT, token_budget=int(os.getenv('CHAT_CONTEXT_TOKEN_BUDGET', '2000')))
+feature_store = FeatureStore(os.getenv('FEATURE_STORE_DIR')) if os.getenv('FEATURE_STORE_DIR') else None
+fingerprint_index = FingerprintIndex(os.getenv('FINGERPRINT_INDEX_DIR')) if os.getenv('FINGERPRINT_INDEX_DIR') else None
+
+MODEL_PATH = os.getenv('MODEL_PATH', './best_best_85_balanced.pth')
+
+# Shadow checkpoints scored alongside production, e.g. SHADOW_MODEL_PATHS="candidate_a=./a.pth,candidate_b=./b.pth"
+shadow_model_paths = dict(
+    entry.split('=', 1) for entry in os.getenv('SHADOW_MODEL_PATHS', '').split(',') if '=' in entry
+)
+
+def create_inference(model_path):
+    if shadow_model_paths:
+        return EnsembleInference(
+            {"production": model_path, **shadow_model_paths},
+            primary="production",
+            feature_store=feature_store
+        )
+    return AudioInference(model_path=model_path, feature_store=feature_store, fingerprint_index=fingerprint_index,
+                          store_embeddings=os.getenv('STORE_EMBEDDINGS') == '1')
+
+model_registry = ModelRegistry(create_inference, MODEL_PATH)
+admission = AdmissionController.from_env()
+transcription_scheduler = AdmissionController.from_env('TRANSCRIPTION', max_concurrent=4, max_queue=32, max_wait_seconds=600)
+
+def probed_audio_seconds(probe, size_bytes, file_name):
+    """Duration from the header probe when available, otherwise a size-based estimate"""
+    if probe and probe.get("duration_seconds"):
+        return probe["duration_seconds"]
+    return estimate_audio_seconds(size_bytes, file_name)
+
+def admission_http_error(rejection):
+    logger.warning(json.dumps({
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "event": "admission_rejected",
+        "reason": rejection.reason,
+        "retry_after": rejection.retry_after,
+        **admission.metrics()
+    }))
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy analyzing other files. Please retry shortly.",
+        headers={"Retry-After": str(rejection.retry_after)}
+    )
+
+async def log_shadow_evaluation(results, user_id, source):
+    ensemble = results.pop('ensemble', None)
+    if not ensemble:
+        return
+    logger.info(json.dumps({
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "event": "shadow_evaluation",
+        "source": source,
+        "user_id": user_id,
+        "primary": ensemble["primary"],
+        "feature_ms": ensemble["feature_ms"],
+        "combined": ensemble["combined"],
+        "models": {
+            name: {k: v for k, v in model.items() if k != "probabilities"}
+            for name, model in ensemble["models"].items()
+        }
+    }))
+    return ensemble
 
 JWT_SECRET = os.getenv("JWT_SECRET")
 if not JWT_SECRET:
@@ -268,11 +390,26 @@ async def validate_token(authorization: str = Header(None)):
 
     return token
 
+SUBSCRIPTION_CACHE_TTL = int(os.getenv('SUBSCRIPTION_CACHE_TTL', '300'))
+subscription_cache = {}
+
 async def validate_subscription_claim(user_id: str, claimed_subscription: bool = None) -> bool:
     """
     Validates subscription status using Stripe when configured.
     In OSS/demo mode (no STRIPE_SECRET_KEY), returns False by default.
+    Stripe answers are cached per user for SUBSCRIPTION_CACHE_TTL seconds.
     """
+    cached = subscription_cache.get(user_id)
+    if cached and cached[1] > time.time():
+        return cached[0]
+
+    has_active = await _validate_subscription_with_stripe(user_id)
+    if has_active is not None:
+        subscription_cache[user_id] = (has_active, time.time() + SUBSCRIPTION_CACHE_TTL)
+    return bool(has_active)
+
+async def _validate_subscription_with_stripe(user_id: str) -> Optional[bool]:
+    """Returns the Stripe verdict, or None when it could not be determined (not cached)"""
     try:
         stripe_secret_key = os.getenv('STRIPE_SECRET_KEY')
 
@@ -329,14 +466,14 @@ async def validate_subscription_claim(user_id: str, claimed_subscription: bool =
                 user_id=user_id,
                 details={"error": str(stripe_error)}
             )
-            return False
+            return None
     except Exception as e:
         await log_security_event(
             event_type="subscription_validation_error",
             user_id=user_id,
             details={"error": str(e)}
         )
-        return False
+        return None
 
 async def extract_user_id_from_token(authorization: str) -> str:
     """Extract user ID from authorization token"""
@@ -363,11 +500,21 @@ class SignedUrlResponse(BaseModel):
 class ReportRequest(BaseModel):
     bucket_name: str
     file_name: str
+    speaker_scores: bool = False
 
 class ReportResponse(BaseModel):
     task_id: str
     status: str
 
+class BatchReportRequest(BaseModel):
+    bucket_name: str
+    file_names: List[str]
+
+class BatchReportResponse(BaseModel):
+    batch_id: str
+    status: str
+    total_files: int
+
 class ChatRequest(BaseModel):
     message: str
     context: Optional[str] = None
@@ -376,6 +523,9 @@ class ChatResponse(BaseModel):
     response: str
     context: str
 
+class ChatStreamRequest(BaseModel):
+    message: str
+
 class SubscriptionInfo(BaseModel):
     has_subscription: bool = False
 
@@ -453,11 +603,72 @@ async def validate_file(file, content=None, file_type=None):
         if not content_valid:
             return False, content_message, sanitized_filename
 
+        probe = probe_audio_bytes(content)
+        max_duration = SECURITY_CONFIG["upload_limits"]["max_duration_seconds"]
+        if probe and probe.get("duration_seconds") and probe["duration_seconds"] > max_duration:
+            return False, f"Audio is longer than the {max_duration // 60} minute limit", sanitized_filename
+
     return True, "File validated successfully", sanitized_filename
 
+async def stream_analysis_ndjson(temp_local_path, user_id, filename, audio_seconds, reservation):
+    """Yield one NDJSON line per scored chunk, then a summary line"""
+    try:
+        await asyncio.to_thread(model_registry.ensure_loaded)
+        async with admission.slot(audio_seconds, reservation=reservation):
+            with model_registry.lease() as generation:
+                inference = generation.detector
+                chunks = await asyncio.to_thread(inference.process_audio_file, temp_local_path)
+                if not chunks:
+                    yield json.dumps({"status": "error", "error": "No valid audio chunks found"}) + "\n"
+                    return
+
+                chunk_seconds = inference.chunk_duration // 1000
+                predictions = []
+                confidences = []
+                async for i, pred, conf in iterate_in_threadpool(inference.iter_chunk_predictions(chunks)):
+                    predictions.append(pred)
+                    confidences.append(conf)
+                    yield json.dumps({
+                        "timestamp": i * chunk_seconds,
+                        "prediction": pred,
+                        "confidence": float(conf)
+                    }) + "\n"
+
+        results = inference.summarize_predictions(predictions, confidences)
+        yield json.dumps({
+            "status": results['status'],
+            "overall_prediction": results['overall_prediction'],
+            "aggregate_confidence": results['aggregate_confidence'],
+            "total_chunks": results['total_chunks'],
+            "model_version": generation.version
+        }) + "\n"
+
+        await log_security_event(
+            event_type="file_processed_successfully",
+            user_id=user_id,
+            details={
+                "filename": filename,
+                "processing": "analysis_stream"
+            }
+        )
+    except Exception as e:
+        await log_security_event(
+            event_type="file_processing_error",
+            user_id=user_id,
+            details={
+                "filename": filename,
+                "error": str(e)
+            }
+        )
+        yield json.dumps({"status": "error", "error": "Analysis failed due to an internal error."}) + "\n"
+    finally:
+        reservation.release()
+        if temp_local_path and os.path.exists(temp_local_path):
+            os.remove(temp_local_path)
+
 @app.post("/analyze", dependencies=[Depends(validate_token)])
 @limiter.limit("10/minute")
-async def analyze_file(request: Request, file: UploadFile, authorization: str = Header(None)):
+async def analyze_file(request: Request, file: UploadFile, stream: bool = False, authorization: str = Header(None)):
 
     token = authorization.replace("Bearer ", "")
     is_valid, user_id = validate_auth_token(token)
@@ -478,6 +689,7 @@ async def analyze_file(request: Request, file: UploadFile, authorization: str =
 
     file.filename = sanitized_filename
     temp_local_path = None
+    reservation = None
 
     try:
 
@@ -531,14 +743,32 @@ async def analyze_file(request: Request, file: UploadFile, authorization: str =
         with open(temp_local_path, "wb") as buffer:
             buffer.write(content_bytes)
 
-        inference = AudioInference(model_path="./best_best_85_balanced.pth")
+        audio_seconds = probed_audio_seconds(probe_audio_bytes(content_bytes), file_size, file.filename)
+        try:
+            reservation = admission.reserve(audio_seconds)
+        except AdmissionRejected as rejection:
+            raise admission_http_error(rejection)
+
+        if stream:
+            stream_path, stream_reservation = temp_local_path, reservation
+            temp_local_path = reservation = None
+            return StreamingResponse(
+                stream_analysis_ndjson(stream_path, user_id, file.filename, audio_seconds, stream_reservation),
+                media_type="application/x-ndjson",
+                # Also released here in case the client disconnects before the body generator starts
+                background=BackgroundTask(stream_reservation.release)
+            )
 
-        loop = asyncio.get_running_loop()
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            results = await loop.run_in_executor(pool, inference.analyze_file, temp_local_path)
+        await asyncio.to_thread(model_registry.ensure_loaded)
+        async with admission.slot(audio_seconds, reservation=reservation):
+            with model_registry.lease() as generation:
+                loop = asyncio.get_running_loop()
+                with concurrent.futures.ThreadPoolExecutor() as pool:
+                    results = await loop.run_in_executor(pool, generation.inference.analyze_file, temp_local_path)
 
         if results.get('status') == 'error':
             raise Exception(results.get('error', 'Unknown error during audio analysis'))
+        await log_shadow_evaluation(results, user_id, "analyze")
 
         await log_security_event(
             event_type="file_processed_successfully",
@@ -549,10 +779,12 @@ async def analyze_file(request: Request, file: UploadFile, authorization: str =
             }
         )
 
-        return JSONResponse(content={
+        return json_response(request, {
             "status": results['status'],
             "overall_prediction": results['overall_prediction'],
             "aggregate_confidence": results['aggregate_confidence'],
+            "model_version": generation.version,
+            "near_duplicate": results.get('near_duplicate'),
             "results": [
                 {
                     "timestamp": i * 3,
@@ -561,6 +793,8 @@ async def analyze_file(request: Request, file: UploadFile, authorization: str =
                 } for i in range(results['total_chunks'])
             ]
         })
+    except HTTPException:
+        raise
     except Exception as e:
         await log_security_event(
             event_type="file_processing_error",
@@ -572,6 +806,8 @@ async def analyze_file(request: Request, file: UploadFile, authorization: str =
         )
         raise HTTPException(status_code=500, detail="Analysis failed due to an internal error.")
     finally:
+        if reservation is not None:
+            reservation.release()
         if temp_local_path and os.path.exists(temp_local_path):
             os.remove(temp_local_path)
 
@@ -583,6 +819,9 @@ async def generate_upload_url(request: SignedUrlRequest, authorization: str = He
         is_valid, user_id = validate_auth_token(token)
         if not bucket_name:
             raise HTTPException(status_code=503, detail="Uploads are disabled in this demo. Configure GCS to enable.")
+        if isinstance(storage_client, LocalBlobStore):
+            # A directory has no signed-URL equivalent; local runs copy files into the bucket directory instead
+            raise HTTPException(status_code=501, detail="Signed upload URLs need GCS; unset LOCAL_BLOB_STORE_DIR or copy files into the local bucket directory.")
 
         await log_security_event(
             event_type="upload_url_requested",
@@ -638,6 +877,8 @@ async def generate_upload_url(request: SignedUrlRequest, authorization: str = He
             "bucket": bucket_name
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in generate_upload_url: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate upload URL.")
@@ -739,7 +980,7 @@ async def transcribe_audio(request: Request, file: UploadFile, authorization: st
             print(f"Is transcription result None? {transcription_result is None}")
             print(f"Transcription result keys: {transcription_result.keys() if transcription_result else 'None'}")
 
-            return JSONResponse(content=transcription_result)
+            return json_response(request, transcription_result)
         finally:
             if os.path.exists(temp_local_path):
                 os.remove(temp_local_path)
@@ -757,9 +998,29 @@ async def transcribe_audio(request: Request, file: UploadFile, authorization: st
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail="Transcription failed due to an internal error.")
 
+def check_uploaded_blob(bucket, file_name):
+    """Raise unless the object exists and was uploaded within the last minute (through a signed URL)"""
+    blob = bucket.blob(file_name)
+    if not blob.exists():
+        raise HTTPException(status_code=404, detail="File not found in storage")
+
+    file_metadata = blob.metadata or {}
+    if 'timeCreated' in file_metadata:
+        time_created = datetime.fromisoformat(file_metadata['timeCreated'].replace('Z', '+00:00'))
+        now = datetime.now(timezone.utc)
+        age_seconds = (now - time_created).total_seconds()
+
+        if age_seconds > 60:
+            raise HTTPException(
+                status_code=400,
+                detail="File appears to be uploaded through unauthorized means"
+            )
+
 @app.post("/report", response_model=ReportResponse, dependencies=[Depends(validate_token)])
-async def create_report(request: ReportRequest):
+async def create_report(request: ReportRequest, authorization: str = Header(None)):
     try:
+        token = authorization.replace("Bearer ", "")
+        is_valid, user_id = validate_auth_token(token)
         print(f"Creating report for file: {request.file_name} in bucket: {request.bucket_name}")
         project_env = os.getenv('GOOGLE_CLOUD_PROJECT')
         queue_env = os.getenv('CLOUD_TASKS_QUEUE')
@@ -770,29 +1031,16 @@ async def create_report(request: ReportRequest):
 
         parent = tasks_client.queue_path(project_env, location_env, queue_env)
 
-        bucket = storage_client.bucket(request.bucket_name)
-        blob = bucket.blob(request.file_name)
-
         print(f"Checking if file exists in GCS...")
-        if not blob.exists():
-            raise HTTPException(status_code=404, detail="File not found in storage")
+        check_uploaded_blob(storage_client.bucket(request.bucket_name), request.file_name)
         print(f"File found in GCS")
 
-        file_metadata = blob.metadata or {}
-        if 'timeCreated' in file_metadata:
-            time_created = datetime.fromisoformat(file_metadata['timeCreated'].replace('Z', '+00:00'))
-            now = datetime.now(timezone.utc)
-            age_seconds = (now - time_created).total_seconds()
-
-            if age_seconds > 60:
-                raise HTTPException(
-                    status_code=400,
-                    detail="File appears to be uploaded through unauthorized means"
-                )
-
+        validated_subscription = await validate_subscription_claim(user_id)
         payload = {
             "bucket_name": request.bucket_name,
-            "file_name": request.file_name
+            "file_name": request.file_name,
+            "priority": "pro" if validated_subscription else "free",
+            "speaker_scores": request.speaker_scores
         }
         print(f"Created task payload: {payload}")
 
@@ -822,20 +1070,48 @@ async def create_report(request: ReportRequest):
         print(f"Created task with ID: {task_id}")
 
         jobs[task_id] = {"status": "pending", "chat_message_count": 0}
+        touch_job(task_id)
         return {"task_id": task_id, "status": "pending"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in create_report: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create report.")
 
 @app.get("/report-status/{task_id}", dependencies=[Depends(validate_token)])
-async def get_report_status(task_id: str, authorization: str = Header(None)):
+async def get_report_status(request: Request, task_id: str, response: Response, format: str = "full", wait: float = 0,
+                            authorization: str = Header(None), if_none_match: Optional[str] = Header(None)):
+    """
+    format=compact returns the timeline in its columnar form (see timeline_codec) instead of per-chunk dicts.
+    Responses carry an ETag of the job version; a matching If-None-Match gets 304. With wait=N the request is
+    held for up to N seconds until the job changes from the version the client already has (or, without an
+    ETag, until an unfinished job changes).
+    """
 
     token = authorization.replace("Bearer ", "")
     is_valid, user_id = validate_auth_token(token)
 
+    known_version = None
+    if if_none_match:
+        try:
+            known_version = int(if_none_match.strip('W/"').split("-")[0])
+        except ValueError:
+            pass
+    elif jobs.get(task_id, {}).get("status") not in ("completed", "error"):
+        known_version = job_versions.get(task_id, 0)
+    if wait > 0 and known_version is not None:
+        await wait_for_job_change(task_id, known_version, min(wait, MAX_STATUS_WAIT_SECONDS))
+
+    # Cached per user (SUBSCRIPTION_CACHE_TTL), so repeat polls do not reach Stripe
     validated_subscription = await validate_subscription_claim(user_id)
 
+    etag = f'"{job_versions.get(task_id, 0)}-{"full" if validated_subscription else "limited"}-{format}"'
+    if if_none_match and if_none_match.replace("W/", "") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    status_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    response.headers.update(status_headers)
+
     if task_id not in jobs:
         print(f"Task {task_id} not found in jobs")
         return {"status": "pending", "results": None, "error": None}
@@ -850,7 +1126,7 @@ async def get_report_status(task_id: str, authorization: str = Header(None)):
 
         summary_stats = next((item for item in job["result"] if "summary_statistics" in item), None)
 
-        timeline_items = [item for item in job["result"] if "timestamp" in item][:3]
+        timeline_items = job_timeline(job, limit=3)
 
         limited_result = []
         if summary_stats:
@@ -861,14 +1137,14 @@ async def get_report_status(task_id: str, authorization: str = Header(None)):
         if "transcription_data" in job and job["transcription_data"]:
             transcription = job["transcription_data"]
             limited_transcription = {
-                "text": transcription.get("text", "")[:200] + "..." if transcription.get("text") else "",
+                "text": transcription.get("text", "")[:LIMITED_TRANSCRIPT_CHARS] + "..." if transcription.get("text") else "",
                 "words": transcription.get("words", [])[:50],
                 "average_sentiment": transcription.get("average_sentiment", {"sentiment": "neutral", "sentiment_score": 0}),
                 "summary": "Upgrade to Pro for full content analysis",
                 "is_limited": True
             }
 
-        return {
+        return json_response(request, {
             "status": job["status"],
             "result": limited_result,
             "overall_prediction": job.get("overall_prediction"),
@@ -876,9 +1152,182 @@ async def get_report_status(task_id: str, authorization: str = Header(None)):
             "transcription_data": limited_transcription,
             "file_name": job.get("file_name"),
             "is_limited": True
+        }, headers=status_headers)
+
+    payload = {key: value for key, value in job.items() if key not in ("ensemble", "chat_history", "chat_prefix")}
+    if "timeline" in payload and format != "compact":
+        payload["result"] = payload["result"] + job_timeline(job)
+        del payload["timeline"]
+    return json_response(request, payload, headers=status_headers)
+
+def get_transcript_index(task_id):
+    """TranscriptIndex for a completed report, rebuilt only when the job version changes"""
+    cached = transcript_indexes.get(task_id)
+    if cached and cached[0] == job_versions.get(task_id, 0):
+        return cached[1]
+    job = jobs[task_id]
+    index = TranscriptIndex(job_timeline(job), job.get("transcription_data"), job.get("attribution"), hop_seconds=3)
+    transcript_indexes[task_id] = (job_versions.get(task_id, 0), index)
+    return index
+
+@app.get("/report-segments/{task_id}", dependencies=[Depends(validate_token)])
+async def get_report_segments(request: Request, task_id: str, start: float = 0, end: float = None, authorization: str = Header(None)):
+    """Detector windows, words (with AI likelihood) and utterances overlapping [start, end) seconds"""
+    token = authorization.replace("Bearer ", "")
+    is_valid, user_id = validate_auth_token(token)
+
+    if jobs.get(task_id, {}).get("status") != "completed":
+        raise HTTPException(status_code=404, detail="Report not found or not completed")
+
+    validated_subscription = await validate_subscription_claim(user_id)
+    index = get_transcript_index(task_id)
+    end = index.hop_seconds * len(index.timeline) if end is None else end
+    if not validated_subscription:
+        # Same preview as the limited /report-status view: the first three windows
+        end = min(end, 3 * index.hop_seconds)
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    segments = index.query(start, end)
+    if not validated_subscription:
+        # An utterance that starts in the preview can run far past it; its text gets the /report-status preview budget
+        segments["utterances"] = limit_utterance_text(segments["utterances"], LIMITED_TRANSCRIPT_CHARS)
+    return json_response(request, {**segments, "is_limited": not validated_subscription})
+
+# In-flight report computations and finished results, keyed by object generation so that
+# Cloud Tasks redeliveries and duplicate tasks for the same upload share one decode/transcribe/infer
+report_computations: Dict[str, asyncio.Task] = {}
+report_task_ids: Dict[str, Set[str]] = {}
+completed_reports: "OrderedDict[str, dict]" = OrderedDict()
+COMPLETED_REPORTS_LIMIT = int(os.getenv('COMPLETED_REPORTS_LIMIT', '256'))
+
+def remember_completed_report(object_key, formatted_results):
+    completed_reports[object_key] = formatted_results
+    completed_reports.move_to_end(object_key)
+    while len(completed_reports) > COMPLETED_REPORTS_LIMIT:
+        completed_reports.popitem(last=False)
+
+def store_report_result(task_id, formatted_results):
+    jobs[task_id] = {**formatted_results, "chat_message_count": jobs.get(task_id, {}).get("chat_message_count", 0)}
+    chat_context_builder.prefix(jobs[task_id])
+    touch_job(task_id)
+
+def finish_report_computation(object_key, file_name, computation):
+    """
+    Done-callback for a shared report computation: writes the result (or error) to every task that joined
+    it, even if the delivery awaiting it was dropped, and retrieves the exception so it is never unobserved.
+    """
+    report_computations.pop(object_key, None)
+    task_ids = report_task_ids.pop(object_key, set())
+    if computation.cancelled():
+        return
+    error = computation.exception()
+    if error is None:
+        remember_completed_report(object_key, computation.result())
+    for task_id in task_ids:
+        if error is None:
+            store_report_result(task_id, computation.result())
+            print(f"Updated job status for task {task_id}: status=completed, total_items={len(computation.result()['result'])}")
+        else:
+            jobs[task_id] = {
+                "status": "error",
+                "error": str(error),
+                "results": None,
+                "file_name": get_original_filename(file_name),
+                "chat_message_count": jobs.get(task_id, {}).get("chat_message_count", 0)
+            }
+            touch_job(task_id)
+
+def report_object_key(bucket_name, file_name, generation, speaker_scores=False):
+    return f"{bucket_name}/{file_name}#{generation or 0}{'+speakers' if speaker_scores else ''}"
+
+async def compute_report(bucket_name, file_name, lane, reservation, speaker_scores=False):
+    # Unique per computation: a plain and a +speakers run of the same object may download concurrently
+    temp_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}_{sanitize_filename(file_name)}")
+    try:
+        loop = asyncio.get_running_loop()
+
+        await download_blob_async(storage_client, bucket_name, file_name, temp_path)
+
+        probe = await asyncio.to_thread(probe_audio_file, temp_path)
+        max_duration = SECURITY_CONFIG["upload_limits"]["max_duration_seconds"]
+        if probe and probe.get("duration_seconds") and probe["duration_seconds"] > max_duration:
+            raise Exception(f"Audio is longer than the {max_duration // 60} minute limit")
+        audio_seconds = probed_audio_seconds(probe, os.path.getsize(temp_path), file_name)
+        transcription_data = None
+        try:
+            async with transcription_scheduler.slot(audio_seconds, reject=False, lane=lane):
+                transcription_data = await transcribe_audio_file(temp_path)
+            print(f"Successfully transcribed file with {len(transcription_data.get('words', []))} words")
+        except Exception as e:
+            print(f"Transcription error (non-critical): {str(e)}")
+
+        await asyncio.to_thread(model_registry.ensure_loaded)
+        async with admission.slot(audio_seconds, lane=lane, reservation=reservation):
+            with model_registry.lease() as generation:
+                with concurrent.futures.ThreadPoolExecutor() as pool:
+                    results = await loop.run_in_executor(pool, generation.inference.analyze_file, temp_path)
+                    speakers = None
+                    if speaker_scores and results.get('status') != 'error':
+                        speakers = await loop.run_in_executor(
+                            pool, score_speakers, generation.detector, temp_path, transcription_data,
+                            results['predictions'], results['confidences']
+                        )
+
+        if results.get('status') == 'error':
+            raise Exception(results.get('error', 'Unknown error during audio analysis'))
+        ensemble = await log_shadow_evaluation(results, None, "report")
+
+        result_array = [
+            {
+                "summary_statistics": {
+                    "total_clips": results['total_chunks'],
+                    "speech_clips": {
+                        "count": results['total_chunks'],
+                        "percentage": 100,
+                        "ai_clips": {
+                            "count": results['ai_chunks'],
+                            "percentage": results['percent_ai']
+                        },
+                        "human_clips": {
+                            "count": results['human_chunks'],
+                            "percentage": results['percent_human']
+                        }
+                    }
+                }
+            }
+        ]
+
+        timeline = [
+            {"timestamp": i * 3, "confidence": float(conf), "prediction": results['predictions'][i]}
+            for i, conf in enumerate(results['confidences'])
+        ]
+
+        formatted_results = {
+            "status": "completed",
+            "result": result_array,
+            "timeline": encode_timeline(results['predictions'], results['confidences'], hop_seconds=3),
+            "attribution": build_attribution(transcription_data, timeline, hop_seconds=3),
+            "speakers": speakers,
+            "overall_prediction": results['overall_prediction'],
+            "aggregate_confidence": results['aggregate_confidence'],
+            "transcription_data": transcription_data,
+            "file_name": get_original_filename(file_name),
+            "model_version": generation.version
         }
 
-    return job
+        if ensemble:
+            formatted_results["ensemble"] = ensemble
+        if results.get('near_duplicate'):
+            formatted_results["near_duplicate"] = results['near_duplicate']
+        if results.get('embeddings'):
+            formatted_results["embeddings"] = results['embeddings']
+        return formatted_results
+
+    finally:
+        reservation.release()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
 @app.post("/process-report")
 async def process_report(request: Request):
@@ -900,117 +1349,380 @@ async def process_report(request: Request):
 
         bucket_name = body.get('bucket_name')
         file_name = body.get('file_name')
+        lane = body.get('priority', 'free')
+        speaker_scores = bool(body.get('speaker_scores'))
 
         if not bucket_name or not file_name:
             raise HTTPException(status_code=400, detail="Missing bucket_name or file_name in request")
 
-        task_id = task_name.split('/')[-1] if task_name else str(random.randint(0, 9999999999999999999))
+        blob = await asyncio.to_thread(storage_client.bucket(bucket_name).get_blob, file_name)
+        object_key = report_object_key(bucket_name, file_name, getattr(blob, "generation", None), speaker_scores)
+        # Without a task name the object generation is the identity, so a redelivery maps to the same job
+        task_id = task_name.split('/')[-1] if task_name else hashlib.sha256(object_key.encode()).hexdigest()[:32]
         print(f"Processing task ID: {task_id}")
 
+        if jobs.get(task_id, {}).get("status") == "completed":
+            print(f"Task {task_id} already completed, skipping")
+            return {"status": "success", "task_id": task_id, "deduplicated": True}
+
+        if object_key in completed_reports:
+            print(f"Reusing completed results for {object_key} in task {task_id}")
+            completed_reports.move_to_end(object_key)
+            store_report_result(task_id, completed_reports[object_key])
+            return {"status": "success", "task_id": task_id, "deduplicated": True}
+
+        computation = report_computations.get(object_key)
+        if computation is None:
+            if blob is None:
+                jobs[task_id] = {"status": "error", "error": "File not found in storage", "results": None,
+                                 "file_name": get_original_filename(file_name)}
+                touch_job(task_id)
+                raise HTTPException(status_code=404, detail="File not found in storage")
+            try:
+                reservation = admission.reserve(probed_audio_seconds(None, blob.size or 0, file_name))
+            except AdmissionRejected as rejection:
+                raise admission_http_error(rejection)
+            computation = asyncio.create_task(compute_report(bucket_name, file_name, lane, reservation, speaker_scores))
+            report_computations[object_key] = computation
+            report_task_ids[object_key] = set()
+            computation.add_done_callback(lambda done: finish_report_computation(object_key, file_name, done))
+        else:
+            print(f"Task {task_id} joined in-progress computation for {object_key}")
+        report_task_ids[object_key].add(task_id)
+
         try:
-            temp_path = os.path.join(tempfile.gettempdir(), file_name)
+            # Shielded so a dropped delivery does not cancel work a redelivery is waiting on; the job itself
+            # is written by finish_report_computation whether or not this delivery is still connected
+            await asyncio.shield(computation)
+        except Exception as e:
+            print(f"Error processing file: {str(e)}")
+            raise HTTPException(status_code=500, detail="Processing failed")
 
-            async def download_file_async(bucket_name, file_name, temp_path):
-                storage_client = storage.Client()
-                bucket = storage_client.bucket(bucket_name)
-                blob = bucket.blob(file_name)
-                with open(temp_path, "wb") as f:
-                    storage_client.download_blob_to_file(blob, f)
+        return {"status": "success", "task_id": task_id}
 
-            inference = AudioInference(model_path="./best_best_85_balanced.pth")
-            loop = asyncio.get_running_loop()
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in process_report: {str(e)}")
+        raise HTTPException(status_code=500, detail="Process report failed")
 
-            await download_file_async(bucket_name, file_name, temp_path)
+def get_original_filename(file_name):
+    if '-' in file_name:
+        parts = file_name.split('-', 1)
+        if len(parts) > 1:
+            return parts[1]
+    return file_name
+
+# Batches with a /process-batch delivery currently running, and strong references to fire-and-forget
+# tasks (the event loop only keeps weak ones, so an unreferenced task can be collected mid-run)
+active_batches: Set[str] = set()
+background_tasks: Set[asyncio.Task] = set()
+
+def spawn_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def batch_progress(files):
+    """Derived from the per-file entries, so recording the same file twice never double counts"""
+    return {
+        "total_files": len(files),
+        "completed_files": sum(1 for f in files.values() if f["status"] == "completed"),
+        "failed_files": sum(1 for f in files.values() if f["status"] == "error")
+    }
 
-            transcription_data = None
-            try:
-                transcription_data = await transcribe_audio_file(temp_path)
-                print(f"Successfully transcribed file with {len(transcription_data.get('words', []))} words")
-            except Exception as e:
-                print(f"Transcription error (non-critical): {str(e)}")
+def new_batch_job(file_names, has_subscription):
+    files = {name: {"file_name": get_original_filename(name), "status": "pending"} for name in file_names}
+    return {
+        "status": "pending",
+        "type": "batch",
+        "has_subscription": has_subscription,
+        "progress": batch_progress(files),
+        "files": files
+    }
 
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                results = await loop.run_in_executor(pool, inference.analyze_file, temp_path)
+def record_batch_file_result(batch_id, name, results):
+    job = jobs[batch_id]
+    if results.get('status') == 'error':
+        job["files"][name] = {
+            "file_name": get_original_filename(name),
+            "status": "error",
+            "error": results.get('error', 'Unknown error during audio analysis')
+        }
+        job["progress"] = batch_progress(job["files"])
+        return
 
-            if results.get('status') == 'error':
-                raise Exception(results.get('error', 'Unknown error during audio analysis'))
+    job["files"][name] = {
+        "file_name": get_original_filename(name),
+        "status": "completed",
+        "overall_prediction": results['overall_prediction'],
+        "aggregate_confidence": round(results['aggregate_confidence'], 4),
+        "percent_ai": round(results['percent_ai'], 2),
+        "total_chunks": results['total_chunks'],
+        "confidences": [round(c, 4) for c in results['confidences']],
+        "predictions": "".join("A" if p == "AI" else "H" for p in results['predictions'])
+    }
+    job["progress"] = batch_progress(job["files"])
 
-            result_array = [
-                {
-                    "summary_statistics": {
-                        "total_clips": results['total_chunks'],
-                        "speech_clips": {
-                            "count": results['total_chunks'],
-                            "percentage": 100,
-                            "ai_clips": {
-                                "count": results['ai_chunks'],
-                                "percentage": results['percent_ai']
-                            },
-                            "human_clips": {
-                                "count": results['human_chunks'],
-                                "percentage": results['percent_human']
-                            }
-                        }
-                    }
-                }
-            ]
+async def run_batch_job(batch_id, local_paths: Dict[str, str], reservation):
+    """Score every downloaded file of a batch with one shared AudioInference and shared batches"""
+    jobs[batch_id]["status"] = "processing"
+    path_to_name = {path: name for name, path in local_paths.items()}
+    try:
+        audio_seconds = sum(
+            probed_audio_seconds(probe_audio_file(path), os.path.getsize(path), path) for path in local_paths.values()
+        )
+        await asyncio.to_thread(model_registry.ensure_loaded)
+        lane = "pro" if jobs[batch_id].get("has_subscription") else "free"
+        async with admission.slot(audio_seconds, lane=lane, reservation=reservation):
+            with model_registry.lease() as generation:
+                jobs[batch_id]["model_version"] = generation.version
+                await asyncio.to_thread(
+                    generation.detector.analyze_files,
+                    list(local_paths.values()),
+                    32,
+                    lambda path, results: record_batch_file_result(batch_id, path_to_name[path], results)
+                )
+        jobs[batch_id]["status"] = "completed"
+    except Exception as e:
+        print(f"Error processing batch {batch_id}: {str(e)}")
+        jobs[batch_id]["status"] = "error"
+        jobs[batch_id]["error"] = str(e)
+    finally:
+        reservation.release()
+        for path in local_paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+        print(f"Batch {batch_id} finished: {jobs[batch_id]['progress']}")
 
-            timeline_data = [
-                {
-                    "timestamp": i * 3,
-                    "confidence": float(conf),
-                    "prediction": results['predictions'][i]
-                }
-                for i, conf in enumerate(results['confidences'])
-            ]
+@app.post("/batch-report", response_model=BatchReportResponse, dependencies=[Depends(validate_token)])
+@limiter.limit("5/minute")
+async def create_batch_report(request: Request, batch_request: BatchReportRequest, authorization: str = Header(None)):
+    token = authorization.replace("Bearer ", "")
+    is_valid, user_id = validate_auth_token(token)
 
-            result_array.extend(timeline_data)
+    max_files = SECURITY_CONFIG["upload_limits"]["max_batch_files"]
+    file_names = list(dict.fromkeys(batch_request.file_names))
+    if not file_names:
+        raise HTTPException(status_code=400, detail="file_names must not be empty")
+    if len(file_names) > max_files:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {max_files} files")
 
-            original_filename = file_name
-            if '-' in file_name:
+    for file_name in file_names:
+        is_valid_file, message, sanitized_filename = await validate_file(file_name)
+        if not is_valid_file or sanitized_filename != file_name:
+            await log_security_event(
+                event_type="invalid_file_rejected",
+                user_id=user_id,
+                details={"reason": "batch_validation_failed", "message": message, "original_filename": file_name}
+            )
+            raise HTTPException(status_code=400, detail=f"{file_name}: {message if not is_valid_file else 'Invalid file name'}")
 
-                parts = file_name.split('-', 1)
-                if len(parts) > 1:
-                    original_filename = parts[1]
+    # Same per-object checks as /report: the object exists and came through a fresh signed-URL upload
+    bucket = storage_client.bucket(batch_request.bucket_name)
+    checks = await asyncio.gather(
+        *(asyncio.to_thread(check_uploaded_blob, bucket, file_name) for file_name in file_names),
+        return_exceptions=True
+    )
+    for file_name, error in zip(file_names, checks):
+        if isinstance(error, HTTPException):
+            await log_security_event(
+                event_type="invalid_file_rejected",
+                user_id=user_id,
+                details={"reason": "batch_object_check_failed", "message": error.detail, "original_filename": file_name}
+            )
+            raise HTTPException(status_code=error.status_code, detail=f"{file_name}: {error.detail}")
+        if isinstance(error, Exception):
+            print(f"Error checking {file_name} for batch report: {str(error)}")
+            raise HTTPException(status_code=500, detail="Failed to create batch report.")
+
+    project_env = os.getenv('GOOGLE_CLOUD_PROJECT')
+    queue_env = os.getenv('CLOUD_TASKS_QUEUE')
+    location_env = os.getenv('CLOUD_TASKS_LOCATION')
+    base_url_env = os.getenv('WORKER_URL')
+    if not (project_env and queue_env and location_env and base_url_env):
+        raise HTTPException(status_code=503, detail="Report processing is disabled. Configure Cloud Tasks and WORKER_URL to enable.")
 
-            formatted_results = {
-                "status": "completed",
-                "result": result_array,
-                "overall_prediction": results['overall_prediction'],
-                "aggregate_confidence": results['aggregate_confidence'],
-                "transcription_data": transcription_data,
-                "file_name": original_filename
-            }
+    validated_subscription = await validate_subscription_claim(user_id)
 
-            jobs[task_id] = formatted_results
-            print(f"Updated job status for task {task_id}: status=completed, total_items={len(result_array)}")
-            return {"status": "success", "task_id": task_id}
+    try:
+        batch_id = str(uuid.uuid4())
+        payload = {
+            "batch_id": batch_id,
+            "bucket_name": batch_request.bucket_name,
+            "file_names": file_names,
+            "priority": "pro" if validated_subscription else "free"
+        }
+        task = {
+            "http_request": {
+                "http_method": tasks_v2.HttpMethod.POST,
+                "url": f"{base_url_env.rstrip('/')}/process-batch",
+                "headers": {
+                    "Content-Type": "application/json",
+                    "Accept": "application/json"
+                },
+                "body": json.dumps(payload).encode(),
+            },
+            "dispatch_deadline": "1800s"
+        }
+        parent = tasks_client.queue_path(project_env, location_env, queue_env)
+        tasks_client.create_task(request={"parent": parent, "task": task})
 
-        except Exception as e:
-            print(f"Error processing file: {str(e)}")
+        jobs[batch_id] = new_batch_job(file_names, validated_subscription)
+        await log_security_event(
+            event_type="batch_report_created",
+            user_id=user_id,
+            details={"batch_id": batch_id, "total_files": len(file_names)}
+        )
+        return {"batch_id": batch_id, "status": "pending", "total_files": len(file_names)}
+    except Exception as e:
+        print(f"Error in create_batch_report: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to create batch report.")
 
-            original_filename = file_name
-            if '-' in file_name:
+@app.post("/batch-analyze", response_model=BatchReportResponse, dependencies=[Depends(validate_token)])
+@limiter.limit("2/minute")
+async def batch_analyze_files(request: Request, files: List[UploadFile], authorization: str = Header(None)):
+    token = authorization.replace("Bearer ", "")
+    is_valid, user_id = validate_auth_token(token)
 
-                parts = file_name.split('-', 1)
-                if len(parts) > 1:
-                    original_filename = parts[1]
+    max_files = SECURITY_CONFIG["upload_limits"]["max_batch_files"]
+    if not files or len(files) > max_files:
+        raise HTTPException(status_code=400, detail=f"Upload between 1 and {max_files} files")
 
-            jobs[task_id] = {
-                "status": "error",
-                "error": str(e),
-                "results": None,
-                "file_name": original_filename
-            }
-            raise HTTPException(status_code=500, detail="Processing failed")
+    try:
+        reservation = admission.reserve()
+    except AdmissionRejected as rejection:
+        raise admission_http_error(rejection)
 
-        finally:
+    batch_id = str(uuid.uuid4())
+    local_paths = {}
+    try:
+        validated_subscription = await validate_subscription_claim(user_id)
+        for file in files:
+            is_valid_file, message, sanitized_filename = await validate_file(file)
+            if not is_valid_file:
+                raise HTTPException(status_code=400, detail=f"{sanitized_filename}: {message}")
+
+            content = await file.read(SECURITY_CONFIG["upload_limits"]["max_file_size"] + 1)
+            if len(content) > SECURITY_CONFIG["upload_limits"]["max_file_size"]:
+                raise HTTPException(status_code=413, detail=f"{sanitized_filename}: File size exceeds {SECURITY_CONFIG['upload_limits']['max_file_size'] // (1024 * 1024)}MB limit")
+            is_valid_content, content_message, _ = await validate_file(file, content=content)
+            if not is_valid_content:
+                raise HTTPException(status_code=400, detail=f"{sanitized_filename}: {content_message}")
+
+            name = f"{len(local_paths)}-{sanitized_filename}"
+            local_paths[name] = f"/tmp/{uuid.uuid4()}_{sanitized_filename}"
+            with open(local_paths[name], "wb") as buffer:
+                buffer.write(content)
+    except BaseException as e:
+        reservation.release()
+        for path in local_paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+        if isinstance(e, HTTPException):
+            await log_security_event(
+                event_type="invalid_file_rejected",
+                user_id=user_id,
+                details={"reason": "batch_validation_failed", "message": e.detail}
+            )
+        raise
+
+    jobs[batch_id] = new_batch_job(list(local_paths.keys()), validated_subscription)
+    spawn_background(run_batch_job(batch_id, local_paths, reservation))
+    return {"batch_id": batch_id, "status": "pending", "total_files": len(local_paths)}
+
+@app.post("/process-batch")
+async def process_batch(request: Request):
+    shared_secret = os.getenv('TASKS_SHARED_SECRET')
+    if shared_secret:
+        incoming_secret = request.headers.get('X-Tasks-Secret', '')
+        if not incoming_secret or not hmac.compare_digest(incoming_secret, shared_secret):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid task secret")
+    else:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Task processing disabled. Set TASKS_SHARED_SECRET to enable.")
+
+    body = await request.json()
+    batch_id = body.get('batch_id')
+    bucket_name = body.get('bucket_name')
+    # Duplicates would download twice into one local_paths slot and leak the first temp file
+    file_names = list(dict.fromkeys(body.get('file_names') or []))
+    if not batch_id or not bucket_name or not file_names:
+        raise HTTPException(status_code=400, detail="Missing batch_id, bucket_name or file_names in request")
+
+    job = jobs.get(batch_id)
+    if job and job.get("type") == "batch":
+        # Cloud Tasks redelivery: finished or still-running batches are not processed again
+        if job["status"] == "completed" or batch_id in active_batches:
+            print(f"Batch {batch_id} already {'completed' if job['status'] == 'completed' else 'running'}, skipping")
+            return {"status": "success", "batch_id": batch_id, "progress": job["progress"], "deduplicated": True}
+        file_names = [name for name in file_names if job["files"].get(name, {}).get("status") != "completed"]
+
+    try:
+        reservation = admission.reserve()
+    except AdmissionRejected as rejection:
+        raise admission_http_error(rejection)
+
+    if batch_id not in jobs or jobs[batch_id].get("type") != "batch":
+        jobs[batch_id] = new_batch_job(file_names, body.get('priority') == "pro")
+    jobs[batch_id]["status"] = "downloading"
+    active_batches.add(batch_id)
+
+    local_paths = {}
+
+    async def download(file_name):
+        temp_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}_{sanitize_filename(file_name)}")
+        try:
+            await download_blob_async(storage_client, bucket_name, file_name, temp_path)
+            probe = await asyncio.to_thread(probe_audio_file, temp_path)
+            max_duration = SECURITY_CONFIG["upload_limits"]["max_duration_seconds"]
+            if probe and probe.get("duration_seconds") and probe["duration_seconds"] > max_duration:
+                os.remove(temp_path)
+                record_batch_file_result(batch_id, file_name, {
+                    "status": "error", "error": f"Audio is longer than the {max_duration // 60} minute limit"
+                })
+                return
+            local_paths[file_name] = temp_path
+        except Exception as e:
+            print(f"Error downloading {file_name} for batch {batch_id}: {str(e)}")
             if os.path.exists(temp_path):
                 os.remove(temp_path)
+            record_batch_file_result(batch_id, file_name, {"status": "error", "error": "Download failed"})
 
-    except Exception as e:
-        print(f"Error in process_report: {str(e)}")
-        raise HTTPException(status_code=500, detail="Process report failed")
+    try:
+        try:
+            await asyncio.gather(*(download(file_name) for file_name in file_names))
+        except BaseException:
+            reservation.release()
+            raise
+        await run_batch_job(batch_id, local_paths, reservation)
+    finally:
+        active_batches.discard(batch_id)
+    return {"status": "success", "batch_id": batch_id, "progress": jobs[batch_id]["progress"]}
+
+@app.get("/batch-status/{batch_id}", dependencies=[Depends(validate_token)])
+async def get_batch_status(request: Request, batch_id: str):
+    if batch_id not in jobs or jobs[batch_id].get("type") != "batch":
+        return {"status": "pending", "progress": None, "files": []}
+
+    job = jobs[batch_id]
+    progress = dict(job["progress"])
+    done = progress["completed_files"] + progress["failed_files"]
+    progress["percent"] = round(100 * done / progress["total_files"], 1) if progress["total_files"] else 100.0
+
+    files = list(job["files"].values())
+    if not job.get("has_subscription"):
+        files = [{k: v for k, v in f.items() if k not in ("confidences", "predictions")} for f in files]
+
+    return json_response(request, {
+        "batch_id": batch_id,
+        "status": job["status"],
+        "error": job.get("error"),
+        "model_version": job.get("model_version"),
+        "progress": progress,
+        "files": files,
+        "is_limited": not job.get("has_subscription")
+    })
 
 @app.post("/check-user-subscription", dependencies=[Depends(validate_token)])
 async def check_user_subscription(authorization: str = Header(None)):
@@ -1025,6 +1737,38 @@ async def check_user_subscription(authorization: str = Header(None)):
         print(f"Error checking subscription: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to check subscription")
 
+async def count_chat_message(task_id, user_id):
+    """Charge one message against the task's chat limit; returns False once the limit is reached"""
+    if task_id not in jobs:
+        jobs[task_id] = {"status": "pending", "chat_message_count": 0}
+    if "chat_message_count" not in jobs[task_id]:
+        jobs[task_id]["chat_message_count"] = 0
+    if jobs[task_id]["chat_message_count"] >= CHAT_MESSAGE_LIMIT:
+        return False
+    jobs[task_id]["chat_message_count"] += 1
+    touch_job(task_id)
+    await log_security_event(
+        event_type="chat_message_counted",
+        user_id=user_id,
+        details={
+            "task_id": task_id,
+            "message_count": jobs[task_id]["chat_message_count"],
+            "limit": CHAT_MESSAGE_LIMIT
+        }
+    )
+    return True
+
+def refund_chat_message(task_id):
+    """Return a message charged by count_chat_message when no reply was delivered"""
+    job = jobs.get(task_id)
+    if job and job.get("chat_message_count", 0) > 0:
+        job["chat_message_count"] -= 1
+        touch_job(task_id)
+
+def sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
 @app.post("/chat", response_model=ChatResponse, dependencies=[Depends(validate_token)])
 @limiter.limit("20/minute")
 async def chat_with_gemini(request: Request, chat_request: ChatRequest, task_id: str = None, authorization: str = Header(None)):
@@ -1048,37 +1792,30 @@ async def chat_with_gemini(request: Request, chat_request: ChatRequest, task_id:
             context=INITIAL_CHAT_CONTEXT
         )
     if validated_subscription and task_id:
-        if task_id not in jobs:
-            jobs[task_id] = {"status": "pending", "chat_message_count": 0}
-        if "chat_message_count" not in jobs[task_id]:
-            jobs[task_id]["chat_message_count"] = 0
-        if jobs[task_id]["chat_message_count"] >= 10:
+        if not await count_chat_message(task_id, user_id):
             return ChatResponse(
                 response="You've reached the maximum of 10 chat messages for this report. Please analyze a new audio file to start a fresh conversation.",
                 context=chat_request.context or INITIAL_CHAT_CONTEXT
             )
-        jobs[task_id]["chat_message_count"] += 1
-        await log_security_event(
-            event_type="chat_message_counted",
-            user_id=user_id,
-            details={
-                "task_id": task_id,
-                "message_count": jobs[task_id]["chat_message_count"],
-                "limit": 10
-            }
-        )
     try:
-        model = GenerativeModel('gemini-1.5-pro-002')
-
-        current_context = INITIAL_CHAT_CONTEXT
-        if chat_request.context and chat_request.context != INITIAL_CHAT_CONTEXT:
-            conversation_history = chat_request.context.replace(INITIAL_CHAT_CONTEXT, "").strip()
-            if conversation_history:
-                current_context = f"{INITIAL_CHAT_CONTEXT}\n\n{conversation_history}"
-
-        prompt = f"{current_context}\n\nNew message:\n{chat_request.message}"
-
-        response = await asyncio.to_thread(model.generate_content, prompt)
+        if task_id:
+            # Same budgeted prompt as /chat/stream: report summary plus the server-side history
+            job = jobs[task_id]
+            prompt = chat_context_builder.build(job, chat_request.message)
+            response = await asyncio.to_thread(chat_model.generate_content, prompt)
+            job.setdefault("chat_history", []).extend([
+                {"role": "user", "content": chat_request.message},
+                {"role": "assistant", "content": response.text}
+            ])
+            return ChatResponse(response=response.text, context=chat_context_builder.prefix(job))
+
+        # No report to summarize: the client's context is the only history, budgeted like any other turn
+        conversation_history = (chat_request.context or "").replace(INITIAL_CHAT_CONTEXT, "").strip()
+        history = [{"role": "user", "content": conversation_history}] if conversation_history else []
+        prompt = chat_context_builder.build({}, chat_request.message, history=history)
+
+        response = await asyncio.to_thread(chat_model.generate_content, prompt)
+        current_context = f"{INITIAL_CHAT_CONTEXT}\n\n{conversation_history}" if conversation_history else INITIAL_CHAT_CONTEXT
         new_context = f"{current_context}\nUser: [redacted]\nAssistant: {response.text}"
 
         return ChatResponse(
@@ -1086,14 +1823,83 @@ async def chat_with_gemini(request: Request, chat_request: ChatRequest, task_id:
             context=new_context
         )
     except Exception as e:
+        if task_id:
+            refund_chat_message(task_id)
         raise HTTPException(status_code=500, detail="Chat failed")
 
+@app.post("/chat/stream", dependencies=[Depends(validate_token)])
+@limiter.limit("20/minute")
+async def stream_chat(request: Request, chat_request: ChatStreamRequest, task_id: str, authorization: str = Header(None)):
+    """
+    Server-sent events chat. The conversation for task_id lives in the job store, so the client sends
+    only the new message; the reply streams as 'data: {"delta": ...}' events followed by 'event: done'.
+    """
+    token = authorization.replace("Bearer ", "")
+    is_valid, user_id = validate_auth_token(token)
+
+    validated_subscription = await validate_subscription_claim(user_id)
+
+    await log_security_event(
+        event_type="chat_request",
+        user_id=user_id,
+        details={
+            "validated_subscription": validated_subscription,
+            "message_length": len(chat_request.message),
+            "streaming": True
+        }
+    )
+    if not validated_subscription:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Chat features are only available for Pro subscribers.")
+    if not await count_chat_message(task_id, user_id):
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=f"Chat limit of {CHAT_MESSAGE_LIMIT} messages reached for this report.")
+
+    job = jobs[task_id]
+    prompt = chat_context_builder.build(job, chat_request.message)
+
+    async def event_stream():
+        # The message is charged up front so concurrent streams cannot overrun the limit, and refunded
+        # unless a complete reply was produced (Gemini error or client disconnect mid-stream)
+        parts = []
+        completed = False
+        try:
+            try:
+                response = await asyncio.to_thread(chat_model.generate_content, prompt, stream=True)
+                async for chunk in iterate_in_threadpool(iter(response)):
+                    text = getattr(chunk, "text", "")
+                    if text:
+                        parts.append(text)
+                        yield sse_event({"delta": text})
+            except Exception as e:
+                print(f"Chat stream failed for task {task_id}: {str(e)}")
+                yield sse_event({"error": "Chat failed"}, event="error")
+                return
+
+            reply = "".join(parts)
+            job.setdefault("chat_history", []).extend([
+                {"role": "user", "content": chat_request.message},
+                {"role": "assistant", "content": reply}
+            ])
+            completed = True
+        finally:
+            if not completed:
+                refund_chat_message(task_id)
+        yield sse_event({
+            "message_count": job.get("chat_message_count", 0),
+            "remaining": max(0, CHAT_MESSAGE_LIMIT - job.get("chat_message_count", 0))
+        }, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/chat-usage/{task_id}", dependencies=[Depends(validate_token)])
 async def get_chat_usage(task_id: str):
     if task_id not in jobs:
-        return {"message_count": 0, "limit": 10, "remaining": 10}
+        return {"message_count": 0, "limit": CHAT_MESSAGE_LIMIT, "remaining": CHAT_MESSAGE_LIMIT}
     message_count = jobs[task_id].get("chat_message_count", 0)
-    limit = 10
+    limit = CHAT_MESSAGE_LIMIT
     remaining = max(0, limit - message_count)
     return {
         "message_count": message_count,
@@ -1101,35 +1907,178 @@ async def get_chat_usage(task_id: str):
         "remaining": remaining
     }
 
+live_batcher = None
+
+async def get_live_batcher():
+    global live_batcher
+    if live_batcher is None:
+        await asyncio.to_thread(model_registry.ensure_loaded)
+        live_batcher = LiveInferenceBatcher(model_registry, max_queue=int(os.getenv('LIVE_MAX_QUEUE', '256')))
+    live_batcher.start()
+    return live_batcher
+
+@app.websocket("/live")
+async def live_analysis(websocket: WebSocket, token: str = None):
+    """
+    Live screening: the client sends an optional JSON config message
+    ({"encoding": "pcm_s16le" | "pcm_f32le" | "opus", "sample_rate": 16000})
+    followed by binary audio frames, and receives one prediction per 3 s window.
+    """
+    is_valid, user_id = validate_auth_token(token) if token else (False, "Missing token")
+    if not is_valid:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    await log_security_event(
+        event_type="live_session_started",
+        user_id=user_id,
+        details={}
+    )
+
+    batcher = await get_live_batcher()
+    session = LiveAudioSession()
+    pending = set()
+
+    async def send_prediction(index, window, received_at):
+        try:
+            pred, conf, model_version = await batcher.submit(window)
+        except LiveOverloaded as e:
+            await websocket.send_json({"window": index, "status": "skipped", "error": str(e)})
+            return
+        await websocket.send_json({
+            "window": index,
+            "timestamp": index * (session.window_samples // session.sample_rate),
+            "prediction": pred,
+            "confidence": float(conf),
+            "model_version": model_version,
+            "latency_ms": round((time.monotonic() - received_at) * 1000, 2)
+        })
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("text") is not None:
+                try:
+                    session = LiveAudioSession.from_config(json.loads(message["text"]))
+                    await websocket.send_json({"status": "configured", "encoding": session.encoding, "sample_rate": session.sample_rate})
+                except ValueError as e:
+                    await websocket.send_json({"status": "error", "error": str(e)})
+                continue
+
+            if message.get("bytes"):
+                received_at = time.monotonic()
+                try:
+                    windows = session.push(message["bytes"])
+                except ValueError as e:
+                    await websocket.send_json({"status": "error", "error": str(e)})
+                    continue
+                for index, window in windows:
+                    task = asyncio.create_task(send_prediction(index, window, received_at))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        await log_security_event(
+            event_type="live_session_error",
+            user_id=user_id,
+            details={"error": str(e)}
+        )
+    finally:
+        # Retrieve every in-flight send so a closed socket's errors are not logged as never retrieved
+        in_flight = list(pending)
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        await log_security_event(
+            event_type="live_session_ended",
+            user_id=user_id,
+            details={
+                "windows": session.windows_emitted,
+                "dropped_samples": session.ring.dropped_samples
+            }
+        )
+
+def verify_admin_secret(request: Request):
+    admin_secret = os.getenv('ADMIN_SECRET')
+    if not admin_secret:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin endpoints disabled. Set ADMIN_SECRET to enable.")
+    incoming_secret = request.headers.get('X-Admin-Secret', '')
+    if not incoming_secret or not hmac.compare_digest(incoming_secret, admin_secret):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin secret")
+
+class ModelReloadRequest(BaseModel):
+    model_path: Optional[str] = None
+
+@app.post("/admin/reload-model", dependencies=[Depends(verify_admin_secret)])
+async def reload_model(reload_request: ModelReloadRequest = None):
+    model_path = reload_request.model_path if reload_request else None
+    if model_path:
+        model_dir = os.path.dirname(os.path.abspath(MODEL_PATH))
+        resolved = os.path.abspath(model_path)
+        if os.path.dirname(resolved) != model_dir or not resolved.endswith(".pth") or not os.path.exists(resolved):
+            raise HTTPException(status_code=400, detail="model_path must be an existing .pth file next to the current checkpoint")
+        model_path = resolved
+    try:
+        result = await model_registry.reload(model_path)
+    except Exception as e:
+        logger.error(f"Model reload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail="Model reload failed; previous checkpoint still serving")
+    await log_security_event(
+        event_type="model_reloaded",
+        user_id="admin",
+        details=result
+    )
+    return {"status": "reloaded", **result}
+
+@app.get("/admin/model", dependencies=[Depends(verify_admin_secret)])
+async def get_model_status():
+    return model_registry.status()
+
+@app.get("/admin/metrics", dependencies=[Depends(verify_admin_secret)])
+async def get_metrics():
+    return {
+        "admission": admission.metrics(),
+        "transcription": transcription_scheduler.metrics(),
+        "downloads": download_stats.metrics(),
+        "live": {
+            "queue_depth": live_batcher.queue.qsize() if live_batcher else 0,
+            "shed_windows": live_batcher.shed_windows if live_batcher else 0
+        },
+        "model": model_registry.status()
+    }
+
+@app.on_event("startup")
+async def start_model_watch():
+    watch_interval = os.getenv('MODEL_WATCH_INTERVAL')
+    if watch_interval:
+        spawn_background(model_registry.watch(float(watch_interval)))
+
+@app.on_event("shutdown")
+async def flush_fingerprint_index():
+    if fingerprint_index is not None:
+        await asyncio.to_thread(fingerprint_index.flush)
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "timestamp": time.time()}
 
+QUARANTINE_BUCKET = os.getenv('QUARANTINE_BUCKET', 'quarantine-bucket')
+
 def validate_uploaded_file(event, context):
-    file = event
-    bucket_name = file['bucket']
-    file_name = file['name']
-    if not (file_name.endswith('.mp3') or file_name.endswith('.wav') or file_name.endswith('.m4a')):
-        print(f"Skipping validation for non-audio file: {file_name}")
-        return
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(file_name)
-    with tempfile.NamedTemporaryFile() as temp:
-        blob.download_to_filename(temp.name)
-        mime = magic.Magic(mime=True)
-        detected_type = mime.from_file(temp.name)
-        valid_types = ['audio/mpeg', 'audio/mp3', 'audio/wav', 'audio/x-wav']
-        if detected_type not in valid_types:
-            print(f"Invalid file detected: {file_name}, type: {detected_type}")
-            blob.delete()
-            quarantine_bucket = storage_client.bucket("quarantine-bucket")
-            quarantine_blob = quarantine_bucket.blob(file_name)
-            quarantine_bucket.copy_blob(blob, quarantine_bucket, file_name)
-            blob.delete()
-            print(f"SECURITY ALERT: Invalid file {file_name} detected and quarantined")
-        else:
-            print(f"File {file_name} validated successfully as {detected_type}")
+    return validate_blob(storage_client, event['bucket'], event['name'], QUARANTINE_BUCKET)
+
+def validate_uploaded_files(events, max_workers=16):
+    return validate_blobs(
+        storage_client,
+        [(event['bucket'], event['name']) for event in events],
+        QUARANTINE_BUCKET,
+        max_workers=max_workers
+    )
 
 async def log_security_event(event_type, user_id, details):
     security_log = {
@@ -1242,10 +2191,16 @@ async def transcribe_audio_file(file_path):
                                             "word": word["word"],
                                             "start": word["start"],
                                             "end": word.get("end", word["start"] + 0.5),
-                                            "confidence": word.get("confidence", 1.0)
+                                            "confidence": word.get("confidence", 1.0),
+                                            "speaker": word.get("speaker")
                                         })
                                 transcription_result["words"] = formatted_words
                                 print(f"Found {len(formatted_words)} words with timestamps")
+                if "results" in result_dict and result_dict["results"].get("utterances"):
+                    transcription_result["utterances"] = [
+                        {"start": u["start"], "end": u["end"], "transcript": u.get("transcript", ""), "speaker": u.get("speaker")}
+                        for u in result_dict["results"]["utterances"]
+                    ]
                 if "results" in result_dict and "sentiments" in result_dict["results"]:
                     sentiments = result_dict["results"]["sentiments"]
                     if "average" in sentiments:
@@ -1296,7 +2251,8 @@ async def transcribe_audio_file(file_path):
                                     "word": word.word,
                                     "start": word.start,
                                     "end": word.end if hasattr(word, 'end') else word.start + 0.5,
-                                    "confidence": word.confidence if hasattr(word, 'confidence') else 1.0
+                                    "confidence": word.confidence if hasattr(word, 'confidence') else 1.0,
+                                    "speaker": getattr(word, 'speaker', None)
                                 })
 
                         transcription_result["words"] = formatted_words
@@ -1317,7 +2273,8 @@ async def transcribe_audio_file(file_path):
                                     "word": word.word,
                                     "start": word.start,
                                     "end": word.end if hasattr(word, 'end') else word.start + 0.5,
-                                    "confidence": word.confidence if hasattr(word, 'confidence') else 1.0
+                                    "confidence": word.confidence if hasattr(word, 'confidence') else 1.0,
+                                    "speaker": getattr(word, 'speaker', None)
                                 })
 
                 if utterances_text:
@@ -1328,6 +2285,18 @@ async def transcribe_audio_file(file_path):
                     transcription_result["words"] = all_words
                     print(f"Got {len(all_words)} words from utterances")
 
+        if hasattr(result, 'utterances') and result.utterances:
+            transcription_result["utterances"] = [
+                {
+                    "start": utterance.start,
+                    "end": utterance.end,
+                    "transcript": utterance.transcript if hasattr(utterance, 'transcript') else "",
+                    "speaker": getattr(utterance, 'speaker', None)
+                }
+                for utterance in result.utterances
+                if hasattr(utterance, 'start') and hasattr(utterance, 'end')
+            ]
+
         sentiment_info = {"sentiment": "neutral", "sentiment_score": 0}
 
         if hasattr(result, 'channels') and result.channels and hasattr(result.channels[0], 'alternatives') and result.channels[0].alternatives:
@@ -0,0 +1,82 @@
+import concurrent.futures
+import os
+import shutil
+import subprocess
+from typing import Optional
+import numpy as np
+
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+FFMPEG_AVAILABLE = shutil.which(FFMPEG_BINARY) is not None
+# soxr matches librosa's default resampler (soxr_hq); builds without libsoxr fall back to swr
+FFMPEG_RESAMPLER = os.getenv('FFMPEG_RESAMPLER', 'soxr')
+DECODE_TIMEOUT_SECONDS = 600
+
+
+class DecodeError(Exception):
+    pass
+
+
+def ffmpeg_command(file_path: str, sample_rate: int, resampler: str = FFMPEG_RESAMPLER,
+                   start: Optional[float] = None, duration: Optional[float] = None):
+    # -ss before -i seeks the input (accurate for audio); -t after it bounds the output
+    seek = ["-ss", f"{start:.3f}"] if start else []
+    limit = ["-t", f"{duration:.3f}"] if duration is not None else []
+    return [
+        FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error",
+        *seek, "-i", file_path, *limit,
+        "-map", "0:a:0", "-vn",
+        "-af", f"aresample={sample_rate}:resampler={resampler}",
+        "-ac", "1", "-ar", str(sample_rate),
+        "-f", "f32le", "-acodec", "pcm_f32le", "pipe:1"
+    ]
+
+
+def decode_ffmpeg(file_path: str, sample_rate: int = 16000, start: Optional[float] = None,
+                  duration: Optional[float] = None) -> np.ndarray:
+    """
+    Decode, downmix and resample in one ffmpeg pass, reading raw mono float32 from its stdout pipe.
+    The returned array is a read-only view over the pipe buffer, with no further copy. start/duration
+    (seconds) decode only that part of the file.
+    """
+    try:
+        proc = subprocess.run(
+            ffmpeg_command(file_path, sample_rate, start=start, duration=duration), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            timeout=DECODE_TIMEOUT_SECONDS, check=False
+        )
+    except subprocess.TimeoutExpired:
+        raise DecodeError(f"ffmpeg timed out decoding {file_path}")
+    if proc.returncode != 0:
+        message = proc.stderr.decode(errors="replace").strip()
+        if FFMPEG_RESAMPLER != "swr" and "soxr" in message:
+            # ffmpeg built without libsoxr: retry once with its own resampler
+            proc = subprocess.run(
+                ffmpeg_command(file_path, sample_rate, resampler="swr", start=start, duration=duration), stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE, timeout=DECODE_TIMEOUT_SECONDS, check=False
+            )
+            message = proc.stderr.decode(errors="replace").strip()
+        if proc.returncode != 0:
+            raise DecodeError(f"ffmpeg failed on {file_path}: {message[-300:]}")
+    return np.frombuffer(proc.stdout, dtype="<f4")
+
+
+class DecodeDispatchPool:
+    """
+    Thread-dispatch pool for ffmpeg decodes, shared by every request in the process. The threads are
+    long-lived but the decoder processes are not: every decode starts a new ffmpeg child writing to a
+    pipe (ffmpeg has no multi-file server mode). What the pool provides is a cap on how many ffmpeg
+    processes run at once, not process reuse.
+    """
+
+    def __init__(self, workers: int, sample_rate: int = 16000):
+        self.workers = workers
+        self.sample_rate = sample_rate
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decoder")
+
+    def submit(self, file_path: str) -> concurrent.futures.Future:
+        return self.executor.submit(decode_ffmpeg, file_path, self.sample_rate)
+
+    def decode(self, file_path: str) -> np.ndarray:
+        return self.submit(file_path).result()
+
+
+decoder_pool = DecodeDispatchPool(int(os.getenv('DECODER_WORKERS', str(os.cpu_count() or 4))))
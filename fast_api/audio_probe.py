@@ -0,0 +1,195 @@
+import io
+import struct
+from typing import BinaryIO, Dict, Optional
+
+MP3_BITRATES = {
+    # (mpeg version 1, layer 3) and (mpeg version 2/2.5, layer 3), kbps
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+}
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],   # MPEG 1
+    2: [22050, 24000, 16000],   # MPEG 2
+    0: [11025, 12000, 8000],    # MPEG 2.5
+}
+M4A_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+def probe_audio(f: BinaryIO, size: Optional[int] = None) -> Optional[Dict]:
+    """
+    Read just enough of a WAV, MP3 or M4A stream to report format, codec, duration, sample rate
+    and channel count, without decoding audio. Returns None if the header is not understood.
+    """
+    try:
+        if size is None:
+            f.seek(0, io.SEEK_END)
+            size = f.tell()
+        f.seek(0)
+        head = f.read(12)
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return _probe_wav(f, size)
+        if head[4:8] == b"ftyp":
+            return _probe_m4a(f, size)
+        return _probe_mp3(f, size, head)
+    except (struct.error, ValueError, OSError):
+        return None
+
+
+def probe_audio_bytes(content: bytes) -> Optional[Dict]:
+    return probe_audio(io.BytesIO(content), len(content))
+
+
+def probe_audio_file(file_path: str) -> Optional[Dict]:
+    with open(file_path, "rb") as f:
+        return probe_audio(f)
+
+
+def _probe_wav(f: BinaryIO, size: int) -> Optional[Dict]:
+    f.seek(12)
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", header)
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", f.read(16))
+            f.seek(chunk_size - 16 + (chunk_size & 1), io.SEEK_CUR)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            audio_format, channels, sample_rate, byte_rate, block_align, bits = fmt
+            data_offset = f.tell()
+            # Streaming writers leave the size at 0 or 0xFFFFFFFF; fall back to the rest of the file
+            if chunk_size in (0, 0xFFFFFFFF) or data_offset + chunk_size > size:
+                chunk_size = size - data_offset
+            codec = {1: f"pcm_s{bits}le", 3: f"pcm_f{bits}le", 0xFFFE: f"pcm_ext{bits}"}.get(audio_format, f"wav_{audio_format}")
+            return {
+                "format": "wav",
+                "codec": codec,
+                "sample_rate": sample_rate,
+                "channels": channels,
+                "bits_per_sample": bits,
+                "block_align": block_align,
+                "data_offset": data_offset,
+                "data_size": chunk_size,
+                "duration_seconds": chunk_size / byte_rate if byte_rate else None
+            }
+        else:
+            f.seek(chunk_size + (chunk_size & 1), io.SEEK_CUR)
+
+
+def _probe_mp3(f: BinaryIO, size: int, head: bytes) -> Optional[Dict]:
+    offset = 0
+    if head[:3] == b"ID3":
+        f.seek(6)
+        tag_size = 0
+        for b in f.read(4):
+            tag_size = (tag_size << 7) | (b & 0x7F)
+        offset = 10 + tag_size
+
+    f.seek(offset)
+    window = f.read(64 * 1024)
+    for i in range(len(window) - 4):
+        if window[i] != 0xFF or (window[i + 1] & 0xE0) != 0xE0:
+            continue
+        b1, b2, b3 = window[i + 1], window[i + 2], window[i + 3]
+        version_bits = (b1 >> 3) & 0x3
+        layer_bits = (b1 >> 1) & 0x3
+        bitrate_index = (b2 >> 4) & 0xF
+        sample_rate_index = (b2 >> 2) & 0x3
+        if version_bits == 1 or layer_bits != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+            continue
+
+        sample_rate = MP3_SAMPLE_RATES[version_bits][sample_rate_index]
+        bitrate = MP3_BITRATES[1 if version_bits == 3 else 2][bitrate_index] * 1000
+        channels = 1 if (b3 >> 6) == 3 else 2
+        samples_per_frame = 1152 if version_bits == 3 else 576
+        audio_start = offset + i
+
+        duration = (size - audio_start) * 8 / bitrate
+        # Xing/Info (VBR) header sits after the side info in the first frame
+        side_info = (17 if channels == 1 else 32) if version_bits == 3 else (9 if channels == 1 else 17)
+        xing = window[i + 4 + side_info:i + 4 + side_info + 12]
+        if xing[:4] in (b"Xing", b"Info") and struct.unpack(">I", xing[4:8])[0] & 0x1:
+            frames = struct.unpack(">I", xing[8:12])[0]
+            duration = frames * samples_per_frame / sample_rate
+
+        return {
+            "format": "mp3",
+            "codec": "mp3",
+            "sample_rate": sample_rate,
+            "channels": channels,
+            "bitrate": bitrate,
+            "duration_seconds": duration
+        }
+    return None
+
+
+def _read_atoms(f: BinaryIO, start: int, end: int):
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        atom_size, atom_type = struct.unpack(">I4s", f.read(8))
+        header_size = 8
+        if atom_size == 1:
+            atom_size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif atom_size == 0:
+            atom_size = end - position
+        if atom_size < header_size:
+            return
+        yield atom_type, position + header_size, position + atom_size
+        position += atom_size
+
+
+def _probe_m4a(f: BinaryIO, size: int) -> Optional[Dict]:
+    info = {"format": "m4a", "codec": None, "sample_rate": None, "channels": None, "duration_seconds": None}
+
+    def walk(start, end):
+        for atom_type, body_start, body_end in _read_atoms(f, start, end):
+            if atom_type in M4A_CONTAINERS:
+                walk(body_start, body_end)
+            elif atom_type == b"mvhd":
+                f.seek(body_start)
+                version = f.read(1)[0]
+                if version == 1:
+                    f.seek(body_start + 20)
+                    timescale, duration = struct.unpack(">IQ", f.read(12))
+                else:
+                    f.seek(body_start + 12)
+                    timescale, duration = struct.unpack(">II", f.read(8))
+                if timescale:
+                    info["duration_seconds"] = duration / timescale
+            elif atom_type == b"stsd" and info["codec"] is None:
+                # version/flags (4) + entry count (4), then the first sample entry
+                f.seek(body_start + 8)
+                _, entry_type = struct.unpack(">I4s", f.read(8))
+                f.seek(body_start + 8 + 8 + 6 + 2 + 8)
+                channels, _, _, _, sample_rate = struct.unpack(">HHHHI", f.read(12))
+                info["codec"] = "aac" if entry_type == b"mp4a" else entry_type.decode("latin-1").strip()
+                info["channels"] = channels
+                info["sample_rate"] = sample_rate >> 16
+
+    # Only atom headers are read; mdat payloads are skipped with seeks, so a trailing moov costs one seek
+    walk(0, size)
+    return info if info["duration_seconds"] is not None else None
+
+
+PCM_SAMPLE_WIDTHS = {"pcm_s16le": 2, "pcm_f32le": 4}
+
+
+def choose_analysis_path(probe: Optional[Dict]) -> str:
+    """
+    'fast' for uncompressed PCM WAV that can be read without a general decoder, 'full' otherwise.
+    A header whose rate, channel count or block alignment does not describe interleaved frames of that
+    codec (e.g. block_align 0) also goes 'full', since the fast readers index the data chunk by it.
+    """
+    if not probe or probe.get("format") != "wav" or probe.get("codec") not in PCM_SAMPLE_WIDTHS:
+        return "full"
+    channels = probe.get("channels") or 0
+    if channels < 1 or (probe.get("sample_rate") or 0) <= 0:
+        return "full"
+    if probe.get("block_align") != channels * PCM_SAMPLE_WIDTHS[probe["codec"]]:
+        return "full"
+    return "fast"
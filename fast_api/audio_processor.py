@@ -6,12 +6,223 @@ from pydub import AudioSegment
 import tempfile
 import numpy as np
 from model import DeepfakeDetectorCNN
-from typing import List, Tuple, Dict
+from feature_store import FeatureStore, hash_file
+from fingerprint import FingerprintIndex, fingerprint_features
+from model_registry import checkpoint_version
+from audio_probe import probe_audio_file, choose_analysis_path
+from audio_decoder import DecodeError, FFMPEG_AVAILABLE, decode_ffmpeg, decoder_pool
+from typing import List, Tuple, Dict, Iterator, Iterable, Callable, Optional, Union
 import librosa
+import threading
+import time
 
 SAMPLE_RATE = 16000
 CLIP_DURATION = 3
 CLIP_SAMPLES = SAMPLE_RATE * CLIP_DURATION
+# Prior chunk scores are reused only for the same bytes or a near-exact, aligned fingerprint match scored by
+# the same checkpoint; a partial match (e.g. a real recording with a spliced-in synthetic segment) is always scored
+FINGERPRINT_REUSE_SIMILARITY = 0.95
+# Partial decodes (speaker re-scoring) merge ranges this close into one decoder pass
+RANGE_MERGE_GAP_SECONDS = 10.0
+
+
+def read_wav_pcm(file_path: str, probe: Dict, start: float = 0.0, duration: Optional[float] = None) -> Tuple[np.ndarray, int]:
+    """
+    Read the data chunk of a PCM WAV (or the start/duration seconds of it) straight into float32 mono,
+    skipping the general decoder. Only for probes choose_analysis_path marks 'fast', which guarantees a
+    block_align matching the frame layout.
+    """
+    dtype = '<i2' if probe['codec'] == 'pcm_s16le' else '<f4'
+    total_frames = probe['data_size'] // probe['block_align']
+    first_frame = min(total_frames, int(round(start * probe['sample_rate'])))
+    frame_count = total_frames - first_frame
+    if duration is not None:
+        frame_count = min(frame_count, int(round(duration * probe['sample_rate'])))
+    with open(file_path, 'rb') as f:
+        f.seek(probe['data_offset'] + first_frame * probe['block_align'])
+        data = np.frombuffer(f.read(frame_count * probe['block_align']), dtype=dtype)
+    data = data.reshape(-1, probe['channels']).astype(np.float32)
+    if dtype == '<i2':
+        data /= 32768.0
+    return data.mean(axis=1) if probe['channels'] > 1 else data[:, 0], probe['sample_rate']
+
+
+def map_wav_windows(file_path: str, target_sr: int = SAMPLE_RATE, chunk_duration: int = CLIP_DURATION * 1000,
+                    probe: Optional[Dict] = None) -> Optional[np.ndarray]:
+    """
+    Full-length windows of a PCM WAV already at target_sr, as a (windows, samples, channels) view over a
+    memory map of its data chunk: nothing is read or converted until a slice is passed to windows_to_tensor.
+    Returns None for anything else (other rates, encodings, or a header choose_analysis_path rejects such as
+    a zero or mismatched block_align) so callers fall back to the general decoder.
+    """
+    probe = probe if probe is not None else probe_audio_file(file_path)
+    if choose_analysis_path(probe) != "fast" or probe['sample_rate'] != target_sr:
+        return None
+    dtype = np.dtype('<i2' if probe['codec'] == 'pcm_s16le' else '<f4')
+    channels = probe['channels']
+    chunk_samples = target_sr * (chunk_duration // 1000)
+    num_windows = probe['data_size'] // probe['block_align'] // chunk_samples
+    if num_windows == 0:
+        return np.zeros((0, chunk_samples, channels), dtype=dtype)
+    data = np.memmap(file_path, dtype=dtype, mode='r', offset=probe['data_offset'],
+                     shape=(num_windows * chunk_samples * channels,))
+    return data.reshape(num_windows, chunk_samples, channels)
+
+
+def windows_to_tensor(windows: np.ndarray) -> torch.Tensor:
+    """(B, samples, channels) PCM windows to a (B, 1, samples) float32 mono batch, scaled like read_wav_pcm"""
+    batch = windows.astype(np.float32)
+    if windows.dtype == np.int16:
+        batch /= 32768.0
+    batch = batch.mean(axis=2) if batch.shape[2] > 1 else batch[:, :, 0]
+    return torch.from_numpy(batch).unsqueeze(1)
+
+
+def decode_audio(file_path: str, target_sr: int = SAMPLE_RATE) -> Tuple[np.ndarray, int]:
+    """
+    Mono float32 samples and their rate. Compressed formats go through the ffmpeg decoder pool, which
+    resamples to target_sr in the same pass; librosa is the fallback when ffmpeg is missing or fails.
+    """
+    probe = probe_audio_file(file_path)
+    if choose_analysis_path(probe) == "fast":
+        return read_wav_pcm(file_path, probe)
+    if FFMPEG_AVAILABLE and decoder_pool.sample_rate == target_sr:
+        try:
+            return decoder_pool.decode(file_path), target_sr
+        except DecodeError as e:
+            print(f"Falling back to librosa: {str(e)}")
+    return librosa.load(file_path, sr=None)
+
+
+def load_audio_chunks(file_path: str, target_sr: int = SAMPLE_RATE, chunk_duration: int = CLIP_DURATION * 1000) -> List[torch.Tensor]:
+    """Decode, resample and cut a file into full-length chunks; needs no model, so it is safe to run in worker processes"""
+    windows = map_wav_windows(file_path, target_sr, chunk_duration)
+    if windows is not None:
+        return [chunk for start in range(0, len(windows), 64) for chunk in windows_to_tensor(windows[start:start + 64])]
+    data, sr = decode_audio(file_path, target_sr)
+    data_resampled = data if sr == target_sr else librosa.resample(data, orig_sr=sr, target_sr=target_sr)
+    chunk_samples = target_sr * (chunk_duration // 1000)
+    chunks = []
+    for i in range(0, len(data_resampled), chunk_samples):
+        chunk = data_resampled[i:i + chunk_samples]
+        if len(chunk) == chunk_samples:
+            chunk_tensor = torch.FloatTensor(chunk).unsqueeze(0)
+            chunks.append(chunk_tensor)
+    return chunks
+
+
+def read_audio_span(file_path: str, probe: Optional[Dict], start: float, duration: float,
+                    target_sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Mono float32 samples at target_sr for start..start+duration seconds, decoding only that part"""
+    if choose_analysis_path(probe) == "fast":
+        data, sr = read_wav_pcm(file_path, probe, start, duration)
+    elif FFMPEG_AVAILABLE:
+        try:
+            return decode_ffmpeg(file_path, target_sr, start=start, duration=duration)
+        except DecodeError as e:
+            print(f"Falling back to librosa: {str(e)}")
+            data, sr = librosa.load(file_path, sr=None, offset=start, duration=duration)
+    else:
+        data, sr = librosa.load(file_path, sr=None, offset=start, duration=duration)
+    return data if sr == target_sr else librosa.resample(data, orig_sr=sr, target_sr=target_sr)
+
+
+def load_audio_ranges(file_path: str, ranges: List[Tuple[float, float]], target_sr: int = SAMPLE_RATE,
+                      merge_gap: float = RANGE_MERGE_GAP_SECONDS) -> List[torch.Tensor]:
+    """
+    (1, samples) clips for (start, duration) ranges in seconds, zero-padded at the end of the file.
+    Ranges closer than merge_gap are decoded as one span, so nearby clips share a decoder pass.
+    """
+    probe = probe_audio_file(file_path)
+    clips: List[Optional[torch.Tensor]] = [None] * len(ranges)
+    order = sorted(range(len(ranges)), key=lambda i: ranges[i][0])
+    spans = []
+    for i in order:
+        start, duration = ranges[i]
+        if spans and start - spans[-1][1] <= merge_gap:
+            spans[-1][1] = max(spans[-1][1], start + duration)
+            spans[-1][2].append(i)
+        else:
+            spans.append([start, start + duration, [i]])
+
+    for span_start, span_end, members in spans:
+        data = read_audio_span(file_path, probe, span_start, span_end - span_start, target_sr)
+        for i in members:
+            start, duration = ranges[i]
+            offset = int(round((start - span_start) * target_sr))
+            samples = int(round(duration * target_sr))
+            clip = np.zeros(samples, dtype=np.float32)
+            piece = data[offset:offset + samples]
+            clip[:len(piece)] = piece
+            clips[i] = torch.from_numpy(clip).unsqueeze(0)
+    return clips
+
+
+class MelFeatureExtractor:
+    """
+    Mel power spectrogram with the STFT window and mel filterbank precomputed on the target device.
+    Matches torchaudio.transforms.MelSpectrogram (center=True, reflect padding, power=2) and
+    accepts any leading batch dimensions: (..., time) -> (..., n_mels, frames).
+    """
+
+    def __init__(self, sample_rate: int, n_fft: int, hop_length: int, n_mels: int,
+                 f_min: float = 0.0, f_max: Optional[float] = None, norm: Optional[str] = None,
+                 mel_scale: str = "htk", device: str = "cpu"):
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mels = n_mels
+        self.device = device
+        self.window = torch.hann_window(n_fft, device=device)
+        self.filterbank = torchaudio.functional.melscale_fbanks(
+            n_freqs=n_fft // 2 + 1,
+            f_min=f_min,
+            f_max=f_max if f_max is not None else sample_rate / 2,
+            n_mels=n_mels,
+            sample_rate=sample_rate,
+            norm=norm,
+            mel_scale=mel_scale
+        ).to(device)
+
+    def __call__(self, waveforms: torch.Tensor) -> torch.Tensor:
+        waveforms = waveforms.to(self.device)
+        leading_shape = waveforms.shape[:-1]
+        flat = waveforms.reshape(-1, waveforms.shape[-1])
+        spec = torch.stft(
+            flat,
+            n_fft=self.n_fft,
+            hop_length=self.hop_length,
+            win_length=self.n_fft,
+            window=self.window,
+            center=True,
+            pad_mode="reflect",
+            normalized=False,
+            onesided=True,
+            return_complex=True
+        ).abs().pow(2.0)
+        mel = torch.matmul(spec.transpose(-1, -2), self.filterbank).transpose(-1, -2)
+        return mel.reshape(leading_shape + mel.shape[-2:])
+
+    @staticmethod
+    def power_to_db(mel: torch.Tensor, amin: float = 1e-10) -> torch.Tensor:
+        return 10.0 * torch.log10(torch.clamp(mel, min=amin))
+
+
+_feature_extractors: Dict[tuple, MelFeatureExtractor] = {}
+_feature_extractors_lock = threading.Lock()
+
+
+def get_feature_extractor(sample_rate: int, n_fft: int, hop_length: int, n_mels: int,
+                          f_min: float = 0.0, f_max: Optional[float] = None, norm: Optional[str] = None,
+                          mel_scale: str = "htk", device: str = "cpu") -> MelFeatureExtractor:
+    """Return the shared extractor for this feature config and device, building it on first use"""
+    key = (sample_rate, n_fft, hop_length, n_mels, f_min, f_max, norm, mel_scale, str(device))
+    with _feature_extractors_lock:
+        if key not in _feature_extractors:
+            _feature_extractors[key] = MelFeatureExtractor(
+                sample_rate, n_fft, hop_length, n_mels, f_min, f_max, norm, mel_scale, device
+            )
+        return _feature_extractors[key]
 
 
 class AudioPreprocessor:
@@ -33,20 +244,11 @@ class AudioPreprocessor:
         if torch.max(torch.abs(waveform)) > 1.0:
             waveform = waveform / (torch.max(torch.abs(waveform)) + 1e-8)
 
-        waveform = waveform.to(device)
-        mel_spectrogram = torchaudio.transforms.MelSpectrogram(
-            sample_rate=self.sample_rate,
-            n_mels=self.n_mels,
-            n_fft=self.n_fft,
-            hop_length=self.hop_length,
-            f_max=self.f_max,
-            f_min=self.f_min,
-            power=2.0,
-        ).to(device)
-
-        amplitude_to_db = torchaudio.transforms.AmplitudeToDB().to(device)
-        spectrogram = mel_spectrogram(waveform)
-        spectrogram = amplitude_to_db(spectrogram)
+        feature_extractor = get_feature_extractor(
+            self.sample_rate, self.n_fft, self.hop_length, self.n_mels,
+            f_min=self.f_min, f_max=self.f_max, device=device
+        )
+        spectrogram = MelFeatureExtractor.power_to_db(feature_extractor(waveform))
         spectrogram = spectrogram - self.global_stats['mean']
         spectrogram = 2 * spectrogram / self.global_stats['range']
         spectrogram = torch.mean(spectrogram, dim=0, keepdim=True)
@@ -67,19 +269,26 @@ class AudioPreprocessor:
             return None
 
 
+def load_detector(model_path: str, device: str) -> DeepfakeDetectorCNN:
+    model = DeepfakeDetectorCNN(num_mel_bands=128)
+    checkpoint = torch.load(model_path, map_location=device)
+    model.load_state_dict(checkpoint['model_state_dict'])
+    model.to(device)
+    model.eval()
+    return model
+
+
 class AudioInference:
-    def __init__(self, model_path: str = 'best_best_85_balanced.pth', device: str = None):
+    def __init__(self, model_path: str = 'best_best_85_balanced.pth', device: str = None,
+                 feature_store: Optional[FeatureStore] = None, fingerprint_index: Optional[FingerprintIndex] = None,
+                 store_embeddings: bool = False):
         self.device = device or ('mps' if torch.backends.mps.is_available() else
                                ('cuda' if torch.cuda.is_available() else 'cpu'))
         print(f"Using device: {self.device}")
-        self.model = DeepfakeDetectorCNN(num_mel_bands=128)
-        checkpoint = torch.load(model_path, map_location=self.device)
-        self.model.load_state_dict(checkpoint['model_state_dict'])
-        self.model.to(self.device)
-        self.model.eval()
+        self.model = load_detector(model_path, self.device)
         self.target_sr = 16000
         self.chunk_duration = 3000
-        self.mel_transform = torchaudio.transforms.MelSpectrogram(
+        self.feature_extractor = get_feature_extractor(
             sample_rate=self.target_sr,
             n_fft=512,
             hop_length=160,
@@ -87,56 +296,122 @@ class AudioInference:
             f_min=20,
             f_max=8000,
             norm='slaney',
-            mel_scale='slaney'
+            mel_scale='slaney',
+            device=self.device
         )
+        self.feature_store = feature_store
+        self.fingerprint_index = fingerprint_index
+        # Embeddings are saved to the feature store, so they need one to live in
+        self.store_embeddings = store_embeddings and feature_store is not None
+        self.model_version = checkpoint_version(model_path) if fingerprint_index is not None or self.store_embeddings else None
+        self.feature_config = {
+            'version': 1,
+            'sample_rate': self.target_sr,
+            'chunk_duration': self.chunk_duration,
+            'n_fft': 512,
+            'hop_length': 160,
+            'n_mels': 128,
+            'f_min': 20,
+            'f_max': 8000,
+            'norm': 'slaney',
+            'mel_scale': 'slaney',
+            'log_offset': 1e-9
+        }
 
     def process_audio_file(self, file_path: str) -> List[torch.Tensor]:
-        data, sr = librosa.load(file_path, sr=None)
-        data_resampled = librosa.resample(data, orig_sr=sr, target_sr=self.target_sr)
-        chunk_samples = self.target_sr * (self.chunk_duration // 1000)
-        chunks = []
-        for i in range(0, len(data_resampled), chunk_samples):
-            chunk = data_resampled[i:i + chunk_samples]
-            if len(chunk) == chunk_samples:
-                chunk_tensor = torch.FloatTensor(chunk).unsqueeze(0)
-                chunks.append(chunk_tensor)
-        return chunks
+        return load_audio_chunks(file_path, self.target_sr, self.chunk_duration)
+
+    def load_audio_ranges(self, file_path: str, ranges: List[Tuple[float, float]]) -> List[torch.Tensor]:
+        return load_audio_ranges(file_path, ranges, self.target_sr)
 
     def prepare_audio_tensor(self, audio_chunk: torch.Tensor) -> torch.Tensor:
-        mel_spec = self.mel_transform(audio_chunk)
+        mel_spec = self.feature_extractor(audio_chunk)
         log_mel_spec = torch.log(mel_spec + 1e-9)
         return log_mel_spec.unsqueeze(0)
 
+    def prepare_batch(self, audio_chunks: List[torch.Tensor]) -> torch.Tensor:
+        """Featurize (1, samples) chunks in one pass on the model device: returns (B, 1, n_mels, frames)"""
+        waveforms = torch.stack(audio_chunks).to(self.device)
+        return torch.log(self.feature_extractor(waveforms) + 1e-9)
+
+    def featurize_chunks(self, chunks: List[torch.Tensor], batch_size: int = 64) -> torch.Tensor:
+        if not chunks:
+            return torch.empty(0, 1, 128, 301)
+        return torch.cat([self.prepare_batch(chunks[i:i + batch_size]) for i in range(0, len(chunks), batch_size)])
+
+    def featurize_windows(self, windows: np.ndarray, batch_size: int = 64) -> torch.Tensor:
+        """Features for memory-mapped WAV windows, converting only one batch of samples to float32 at a time"""
+        if len(windows) == 0:
+            return torch.empty(0, 1, 128, 301)
+        return torch.cat([
+            torch.log(self.feature_extractor(windows_to_tensor(windows[i:i + batch_size]).to(self.device)) + 1e-9)
+            for i in range(0, len(windows), batch_size)
+        ])
+
+    def decode_and_featurize(self, file_path: str) -> torch.Tensor:
+        windows = map_wav_windows(file_path, self.target_sr, self.chunk_duration)
+        if windows is not None:
+            return self.featurize_windows(windows)
+        return self.featurize_chunks(self.process_audio_file(file_path))
+
+    def lookup_features(self, file_path: str, content_hash: Optional[str] = None) -> Tuple[str, Optional[torch.Tensor]]:
+        content_hash = content_hash or hash_file(file_path)
+        cached = self.feature_store.get(content_hash, self.feature_config)
+        if cached is None:
+            return content_hash, None
+        return content_hash, torch.from_numpy(np.asarray(cached, dtype=np.float32))
+
+    def featurize_file(self, file_path: str, content_hash: Optional[str] = None) -> torch.Tensor:
+        """Log-mel features for every chunk of a file, read from the feature store when cached"""
+        if self.feature_store is None:
+            return self.decode_and_featurize(file_path)
+
+        content_hash, cached = self.lookup_features(file_path, content_hash)
+        if cached is not None:
+            return cached
+
+        features = self.decode_and_featurize(file_path)
+        self.feature_store.put(content_hash, self.feature_config, features)
+        return features
+
+    def _label_probability(self, probability_ai: float) -> Tuple[str, float]:
+        if probability_ai > 0.5:
+            return "AI", probability_ai
+        return "Human", 1 - probability_ai
+
     def predict_chunk(self, audio_tensor: torch.Tensor) -> Tuple[str, float]:
         with torch.no_grad():
             audio_tensor = audio_tensor.to(self.device)
             output = self.model(audio_tensor)
-            probability_ai = output.item()
-            if probability_ai > 0.5:
-                prediction = "AI"
-                confidence = probability_ai
-            else:
-                prediction = "Human"
-                confidence = 1 - probability_ai
-            return prediction, confidence
+            return self._label_probability(output.item())
 
-    def analyze_file(self, file_path: str) -> Dict:
-        print(f"\nProcessing: {file_path}")
-        chunks = self.process_audio_file(file_path)
+    def predict_probabilities(self, audio_tensors: torch.Tensor, model: Optional[nn.Module] = None) -> List[float]:
+        with torch.no_grad():
+            outputs = (model or self.model)(audio_tensors.to(self.device))
+            return outputs.view(-1).cpu().tolist()
 
-        if not chunks:
-            print(f"Warning: No valid 3-second chunks found in {file_path}")
-            return {'error': 'No valid audio chunks found', 'status': 'error'}
+    def predict_with_embeddings(self, audio_tensors: torch.Tensor) -> Tuple[List[float], np.ndarray]:
+        """P(AI) per input plus its fc1 embedding as a (B, 128) float16 array, from one forward pass"""
+        with torch.no_grad():
+            outputs, embeddings = self.model.forward_with_embedding(audio_tensors.to(self.device))
+            return outputs.view(-1).cpu().tolist(), embeddings.to("cpu", torch.float16).numpy()
 
-        predictions = []
-        confidences = []
+    def predict_batch(self, audio_tensors: torch.Tensor) -> List[Tuple[str, float]]:
+        return [self._label_probability(p) for p in self.predict_probabilities(audio_tensors)]
 
-        for chunk in chunks:
-            audio_tensor = self.prepare_audio_tensor(chunk)
-            pred, conf = self.predict_chunk(audio_tensor)
-            predictions.append(pred)
-            confidences.append(conf)
+    def iter_chunk_predictions(self, chunks: List[torch.Tensor], batch_size: int = 16) -> Iterator[Tuple[int, str, float]]:
+        """Yield (chunk_index, prediction, confidence) as soon as each batch is scored"""
+        for start in range(0, len(chunks), batch_size):
+            batch = self.prepare_batch(chunks[start:start + batch_size])
+            for offset, (pred, conf) in enumerate(self.predict_batch(batch)):
+                yield start + offset, pred, conf
 
+    def iter_feature_predictions(self, features: torch.Tensor, batch_size: int = 16) -> Iterator[Tuple[int, str, float]]:
+        for start in range(0, len(features), batch_size):
+            for offset, (pred, conf) in enumerate(self.predict_batch(features[start:start + batch_size])):
+                yield start + offset, pred, conf
+
+    def summarize_predictions(self, predictions: List[str], confidences: List[float]) -> Dict:
         ai_chunks = predictions.count("AI")
         human_chunks = predictions.count("Human")
         total_chunks = len(predictions)
@@ -168,4 +443,246 @@ class AudioInference:
             'predictions': predictions
         }
 
-        return results
\ No newline at end of file
+        return results
+
+    def analyze_file(self, file_path: str) -> Dict:
+        print(f"\nProcessing: {file_path}")
+        needs_hash = self.feature_store is not None or self.fingerprint_index is not None
+        content_hash = hash_file(file_path) if needs_hash else None
+        features = self.featurize_file(file_path, content_hash)
+
+        if len(features) == 0:
+            print(f"Warning: No valid 3-second chunks found in {file_path}")
+            return {'error': 'No valid audio chunks found', 'status': 'error'}
+
+        fingerprint = match = None
+        if self.fingerprint_index is not None:
+            fingerprint = fingerprint_features(features.detach().cpu())
+            match = self.fingerprint_index.lookup(*fingerprint)
+            if match is not None and self._can_reuse(match, content_hash, len(features)):
+                record = match["record"]
+                print(f"Duplicate of indexed clip {record['clip_id']} (similarity {match['similarity']}), reusing its scores")
+                results = self.summarize_predictions(
+                    ["AI" if p == "A" else "Human" for p in record["predictions"]], record["confidences"]
+                )
+                results['near_duplicate'] = self._describe_match(match, reused=True)
+                stored = self.feature_store.get_embeddings(record["key"], self.model_version) if self.store_embeddings else None
+                if stored is not None:
+                    results['embeddings'] = self._embedding_reference(record["key"], stored)
+                return results
+
+        predictions = []
+        confidences = []
+        embeddings = []
+
+        if self.store_embeddings:
+            for start in range(0, len(features), 16):
+                probabilities, batch_embeddings = self.predict_with_embeddings(features[start:start + 16])
+                for pred, conf in map(self._label_probability, probabilities):
+                    predictions.append(pred)
+                    confidences.append(conf)
+                embeddings.append(batch_embeddings)
+        else:
+            for _, pred, conf in self.iter_feature_predictions(features):
+                predictions.append(pred)
+                confidences.append(conf)
+
+        results = self.summarize_predictions(predictions, confidences)
+        if embeddings:
+            results['embeddings'] = self.save_embeddings(content_hash, np.concatenate(embeddings))
+        if fingerprint is not None:
+            if match is not None:
+                results['near_duplicate'] = self._describe_match(match, reused=False)
+            self.fingerprint_index.add({
+                "key": content_hash,
+                "model_version": self.model_version,
+                "chunks": len(predictions),
+                "overall_prediction": results['overall_prediction'],
+                "aggregate_confidence": round(results['aggregate_confidence'], 4),
+                "predictions": "".join("A" if p == "AI" else "H" for p in predictions),
+                "confidences": [round(c, 4) for c in confidences]
+            }, *fingerprint)
+        return results
+
+    def save_embeddings(self, content_hash: str, embeddings: np.ndarray) -> Dict:
+        """Store per-chunk embeddings and return the reference kept with the results"""
+        self.feature_store.put_embeddings(content_hash, self.model_version, embeddings)
+        return self._embedding_reference(content_hash, embeddings)
+
+    def _embedding_reference(self, content_hash: str, embeddings: np.ndarray) -> Dict:
+        return {
+            "content_hash": content_hash,
+            "model_version": self.model_version,
+            "chunks": int(embeddings.shape[0]),
+            "dim": int(embeddings.shape[1])
+        }
+
+    def _can_reuse(self, match: Dict, content_hash: str, num_chunks: int) -> bool:
+        record = match["record"]
+        if record["model_version"] != self.model_version:
+            return False
+        if record["key"] == content_hash:
+            return True
+        return (match["similarity"] >= FINGERPRINT_REUSE_SIMILARITY and abs(match["offset_seconds"]) <= 0.05
+                and record["chunks"] == num_chunks)
+
+    def _describe_match(self, match: Dict, reused: bool) -> Dict:
+        record = match["record"]
+        return {
+            "clip_id": record["clip_id"],
+            "key": record["key"],
+            "similarity": match["similarity"],
+            "offset_seconds": match["offset_seconds"],
+            "overall_prediction": record["overall_prediction"],
+            "aggregate_confidence": record["aggregate_confidence"],
+            "model_version": record["model_version"],
+            "reused_scores": reused
+        }
+
+    def analyze_files(self, file_paths: List[str], batch_size: int = 16,
+                      on_file_done: Optional[Callable[[str, Dict], None]] = None) -> Dict[str, Dict]:
+        """Analyze several files, sharing inference batches across file boundaries"""
+        def featurize_all():
+            for path in file_paths:
+                try:
+                    yield path, self.featurize_file(path)
+                except Exception as e:
+                    yield path, e
+
+        return self.analyze_features(featurize_all(), batch_size, on_file_done)
+
+    def analyze_decoded(self, decoded: Iterable[Tuple[str, Union[List[torch.Tensor], Exception]]], batch_size: int = 16,
+                        on_file_done: Optional[Callable[[str, Dict], None]] = None) -> Dict[str, Dict]:
+        """Score (key, chunks) pairs as they arrive; chunks may be an Exception raised while decoding"""
+        def featurize_all():
+            for key, chunks in decoded:
+                if isinstance(chunks, Exception):
+                    yield key, chunks
+                else:
+                    yield key, self.featurize_chunks(chunks, batch_size)
+
+        return self.analyze_features(featurize_all(), batch_size, on_file_done)
+
+    def analyze_features(self, featurized: Iterable[Tuple[str, Union[torch.Tensor, Exception]]], batch_size: int = 16,
+                         on_file_done: Optional[Callable[[str, Dict], None]] = None,
+                         with_embeddings: bool = False) -> Dict[str, Dict]:
+        """
+        Score (key, features) pairs, filling inference batches across file boundaries. with_embeddings adds
+        each file's (chunks, 128) float16 fc1 embeddings to its results as 'embeddings' for the caller to store.
+        """
+        results = {}
+        scored = {}
+        remaining = {}
+        pending = []
+
+        def finish(key, file_results):
+            results[key] = file_results
+            if on_file_done:
+                on_file_done(key, file_results)
+
+        def flush(batch):
+            tensors = torch.stack([row.to(self.device) for _, row in batch])
+            if with_embeddings:
+                probabilities, embeddings = self.predict_with_embeddings(tensors)
+            else:
+                probabilities, embeddings = self.predict_probabilities(tensors), [None] * len(batch)
+            for (key, _), probability, embedding in zip(batch, probabilities, embeddings):
+                pred, conf = self._label_probability(probability)
+                scored[key][0].append(pred)
+                scored[key][1].append(conf)
+                scored[key][2].append(embedding)
+                remaining[key] -= 1
+                if remaining[key] == 0:
+                    predictions, confidences, file_embeddings = scored.pop(key)
+                    file_results = self.summarize_predictions(predictions, confidences)
+                    if with_embeddings:
+                        file_results['embeddings'] = np.stack(file_embeddings)
+                    finish(key, file_results)
+
+        for key, features in featurized:
+            if isinstance(features, Exception):
+                finish(key, {'error': str(features), 'status': 'error'})
+                continue
+            if len(features) == 0:
+                finish(key, {'error': 'No valid audio chunks found', 'status': 'error'})
+                continue
+
+            scored[key] = ([], [], [])
+            remaining[key] = len(features)
+            pending.extend((key, row) for row in features)
+            while len(pending) >= batch_size:
+                flush(pending[:batch_size])
+                pending = pending[batch_size:]
+
+        if pending:
+            flush(pending)
+
+        return results
+
+
+class EnsembleInference:
+    """
+    Scores each file with several detector checkpoints while decoding and featurizing it only once.
+    The primary checkpoint's results keep the AudioInference.analyze_file shape; the others are
+    reported under 'ensemble' together with a combined (mean probability) verdict and per-model cost.
+    """
+
+    def __init__(self, model_paths: Dict[str, str], primary: str, device: str = None,
+                 feature_store: Optional[FeatureStore] = None, batch_size: int = 32):
+        self.primary = primary
+        self.batch_size = batch_size
+        self.inference = AudioInference(model_path=model_paths[primary], device=device, feature_store=feature_store)
+        self.chunk_duration = self.inference.chunk_duration
+        self.models = {primary: self.inference.model}
+        for name, path in model_paths.items():
+            if name != primary:
+                self.models[name] = load_detector(path, self.inference.device)
+
+    def _summarize_probabilities(self, probabilities: List[float]) -> Dict:
+        labelled = [self.inference._label_probability(p) for p in probabilities]
+        return self.inference.summarize_predictions([pred for pred, _ in labelled], [conf for _, conf in labelled])
+
+    def analyze_file(self, file_path: str) -> Dict:
+        print(f"\nProcessing (ensemble of {len(self.models)}): {file_path}")
+        start = time.perf_counter()
+        features = self.inference.featurize_file(file_path)
+        feature_ms = (time.perf_counter() - start) * 1000
+
+        if len(features) == 0:
+            return {'error': 'No valid audio chunks found', 'status': 'error'}
+
+        probabilities = {}
+        costs = {}
+        for name, model in self.models.items():
+            start = time.perf_counter()
+            probabilities[name] = []
+            for i in range(0, len(features), self.batch_size):
+                probabilities[name].extend(self.inference.predict_probabilities(features[i:i + self.batch_size], model))
+            costs[name] = (time.perf_counter() - start) * 1000
+
+        per_model = {}
+        for name, probs in probabilities.items():
+            summary = self._summarize_probabilities(probs)
+            per_model[name] = {
+                'overall_prediction': summary['overall_prediction'],
+                'aggregate_confidence': summary['aggregate_confidence'],
+                'percent_ai': summary['percent_ai'],
+                'probabilities': [round(p, 6) for p in probs],
+                'inference_ms': round(costs[name], 2)
+            }
+
+        combined_probs = np.mean([probabilities[name] for name in self.models], axis=0).tolist()
+        combined = self._summarize_probabilities(combined_probs)
+
+        results = self._summarize_probabilities(probabilities[self.primary])
+        results['ensemble'] = {
+            'primary': self.primary,
+            'feature_ms': round(feature_ms, 2),
+            'models': per_model,
+            'combined': {
+                'overall_prediction': combined['overall_prediction'],
+                'aggregate_confidence': combined['aggregate_confidence'],
+                'percent_ai': combined['percent_ai']
+            }
+        }
+        return results
@@ -0,0 +1,127 @@
+"""
+Decoder benchmark and parity check: librosa.load + librosa.resample (the previous path) against the
+ffmpeg decoder pool, per file format. Parity is the SNR of the ffmpeg output against librosa after
+aligning any decoder delay (MP3/AAC priming samples), plus the number of 3 s chunks each produces.
+Exits non-zero when a file falls below --min-snr or the chunk counts differ by more than one
+(decoders trim priming samples differently, which can move a file across a chunk boundary).
+
+    python bench_decode.py /data/samples [--repeat 3] [--min-snr 30]
+    python bench_decode.py --synthesize /tmp/decode-bench    # write a test clip in each format first
+"""
+import argparse
+import collections
+import os
+import subprocess
+import sys
+import time
+
+import librosa
+import numpy as np
+
+from audio_decoder import FFMPEG_AVAILABLE, FFMPEG_BINARY, decoder_pool, decode_ffmpeg
+from audio_processor import CLIP_SAMPLES, SAMPLE_RATE
+
+FORMATS = {
+    "wav": ["-c:a", "pcm_s16le"],
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "128k"],
+    "m4a": ["-c:a", "aac", "-b:a", "128k"],
+    "flac": ["-c:a", "flac"],
+    "ogg": ["-c:a", "libvorbis", "-q:a", "5"]
+}
+MAX_LAG_SAMPLES = 4096
+
+
+def synthesize(directory: str, seconds: int = 60):
+    """A 44.1 kHz stereo sweep plus noise in every format, so the check runs without sample data"""
+    os.makedirs(directory, exist_ok=True)
+    source = f"aevalsrc=0.3*sin(2*PI*(200+40*t)*t)+0.05*random(0)|0.3*sin(2*PI*(300+30*t)*t)+0.05*random(1):s=44100:d={seconds}"
+    for extension, codec in FORMATS.items():
+        subprocess.run([FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi", "-i", source, *codec,
+                        os.path.join(directory, f"synthetic.{extension}")], check=True)
+
+
+def librosa_decode(path: str) -> np.ndarray:
+    data, sr = librosa.load(path, sr=None)
+    return librosa.resample(data, orig_sr=sr, target_sr=SAMPLE_RATE)
+
+
+def aligned_snr(reference: np.ndarray, candidate: np.ndarray):
+    """(snr_db, lag) after shifting candidate by the lag that best matches the first few seconds"""
+    head = min(len(reference), len(candidate), SAMPLE_RATE * 4)
+    if head <= 2 * MAX_LAG_SAMPLES:
+        return float("nan"), 0
+    ref, cand = reference[:head], candidate[:head]
+    size = 1 << int(np.ceil(np.log2(2 * head)))
+    correlation = np.fft.irfft(np.fft.rfft(ref, size) * np.conj(np.fft.rfft(cand, size)), size)
+    lags = np.concatenate([np.arange(0, MAX_LAG_SAMPLES + 1), np.arange(-MAX_LAG_SAMPLES, 0)])
+    lag = int(lags[np.argmax(correlation[lags])])
+    if lag >= 0:
+        ref, cand = reference[lag:], candidate
+    else:
+        ref, cand = reference, candidate[-lag:]
+    n = min(len(ref), len(cand))
+    noise = np.sum((ref[:n] - cand[:n]) ** 2)
+    return 10 * np.log10(np.sum(ref[:n] ** 2) / max(noise, 1e-20)), lag
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return out, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and check the ffmpeg decoder against librosa")
+    parser.add_argument("paths", nargs="*", help="Audio files or directories")
+    parser.add_argument("--synthesize", help="Write a synthetic clip per format into this directory and use it")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-snr", type=float, default=30.0)
+    args = parser.parse_args()
+    if not FFMPEG_AVAILABLE:
+        parser.error(f"{FFMPEG_BINARY} not found on PATH")
+
+    paths = []
+    if args.synthesize:
+        synthesize(args.synthesize)
+        args.paths.append(args.synthesize)
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if os.path.splitext(name)[1].lstrip(".").lower() in FORMATS)
+        else:
+            paths.append(path)
+    if not paths:
+        parser.error("no audio files given")
+
+    by_format = collections.defaultdict(list)
+    failures = 0
+    for path in paths:
+        extension = os.path.splitext(path)[1].lstrip(".").lower()
+        reference, librosa_seconds = timed(lambda: librosa_decode(path), args.repeat)
+        decoded, ffmpeg_seconds = timed(lambda: decode_ffmpeg(path, SAMPLE_RATE), args.repeat)
+        snr, lag = aligned_snr(reference, decoded)
+        chunks = (len(reference) // CLIP_SAMPLES, len(decoded) // CLIP_SAMPLES)
+        ok = snr >= args.min_snr and abs(chunks[0] - chunks[1]) <= 1
+        failures += not ok
+        by_format[extension].append((len(reference) / SAMPLE_RATE, librosa_seconds, ffmpeg_seconds))
+        print(f"{'ok  ' if ok else 'FAIL'} {os.path.basename(path):<32} snr {snr:6.1f} dB  lag {lag:+5d}  "
+              f"chunks {chunks[0]}/{chunks[1]}  librosa {librosa_seconds * 1000:8.1f} ms  ffmpeg {ffmpeg_seconds * 1000:8.1f} ms")
+
+    print(f"\n{'format':<6} {'files':>5} {'librosa x-realtime':>19} {'ffmpeg x-realtime':>18} {'speedup':>8}")
+    for extension, rows in sorted(by_format.items()):
+        audio = sum(r[0] for r in rows)
+        librosa_total, ffmpeg_total = sum(r[1] for r in rows), sum(r[2] for r in rows)
+        print(f"{extension:<6} {len(rows):>5} {audio / librosa_total:>19.0f} {audio / ffmpeg_total:>18.0f} "
+              f"{librosa_total / ffmpeg_total:>7.1f}x")
+
+    start = time.perf_counter()
+    futures = [decoder_pool.submit(path) for path in paths for _ in range(args.repeat)]
+    audio = sum(len(f.result()) for f in futures) / SAMPLE_RATE
+    elapsed = time.perf_counter() - start
+    print(f"\npool of {decoder_pool.workers}: {len(futures)} decodes, {audio / elapsed:.0f}x realtime overall")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
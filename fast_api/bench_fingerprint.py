@@ -0,0 +1,80 @@
+"""
+Fingerprint index benchmark on synthetic clips: builds an index of --clips fingerprints (random landmark
+hashes at the density fingerprint_features produces for --seconds of audio), then times lookups of
+re-encoded copies (a share of hashes dropped, the rest shifted by a fixed offset) and of unseen clips.
+
+    python bench_fingerprint.py [--clips 1000000] [--seconds 30] [--queries 200] [--compact] [--root /tmp/fp-bench]
+"""
+import argparse
+import os
+import shutil
+import time
+import numpy as np
+from fingerprint import FAN_OUT, FingerprintIndex, PEAKS_PER_SECOND
+
+
+def synthetic_fingerprint(rng, seconds: int):
+    count = seconds * PEAKS_PER_SECOND * FAN_OUT
+    hashes = rng.integers(0, 1 << 20, count, dtype=np.uint32)
+    times = np.sort(rng.integers(0, seconds * 100, count)).astype(np.uint32)
+    return hashes, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fingerprint index build and lookup")
+    parser.add_argument("--clips", type=int, default=1_000_000)
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--drop", type=float, default=0.5, help="share of hashes lost in the re-encoded copy")
+    parser.add_argument("--compact", action="store_true", help="merge segments before querying (needs RAM for all postings)")
+    parser.add_argument("--root", default="/tmp/fingerprint-bench")
+    args = parser.parse_args()
+
+    shutil.rmtree(args.root, ignore_errors=True)
+    rng = np.random.default_rng(0)
+    index = FingerprintIndex(args.root, flush_postings=20_000_000)
+    query_ids = set(rng.choice(args.clips, size=min(args.queries, args.clips), replace=False).tolist())
+    queries = []
+
+    start = time.perf_counter()
+    for clip in range(args.clips):
+        hashes, times = synthetic_fingerprint(rng, args.seconds)
+        index.add({"key": f"clip-{clip}"}, hashes, times)
+        if clip in query_ids:
+            keep = rng.random(len(hashes)) >= args.drop
+            queries.append((clip, hashes[keep], times[keep] + 150))
+    index.flush()
+    build_seconds = time.perf_counter() - start
+    segments = len(index.segments)
+    start = time.perf_counter()
+    if args.compact:
+        index.compact()
+    compact_seconds = time.perf_counter() - start
+    postings = sum(len(s.hashes) for s in index.segments)
+    size = sum(os.path.getsize(os.path.join(dp, f)) for dp, _, fs in os.walk(args.root) for f in fs)
+    print(f"build     {args.clips:>10,} clips  {postings:>13,} postings  {build_seconds:8.1f} s  "
+          f"({segments} segments, compact {compact_seconds:.1f} s, {size / 1e9:.2f} GB on disk)")
+
+    latencies, found = [], 0
+    for clip, hashes, times in queries:
+        start = time.perf_counter()
+        match = index.lookup(hashes, times)
+        latencies.append(time.perf_counter() - start)
+        found += match is not None and match["clip_id"] == clip and abs(match["offset_seconds"] + 1.5) < 0.05
+    latencies = np.array(latencies) * 1000
+    print(f"duplicate lookups  recall {found / len(queries):.3f}  "
+          f"p50 {np.percentile(latencies, 50):.1f} ms  p99 {np.percentile(latencies, 99):.1f} ms")
+
+    misses, latencies = 0, []
+    for _ in range(len(queries)):
+        hashes, times = synthetic_fingerprint(rng, args.seconds)
+        start = time.perf_counter()
+        misses += index.lookup(hashes, times) is not None
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    print(f"unseen lookups     false matches {misses}  "
+          f"p50 {np.percentile(latencies, 50):.1f} ms  p99 {np.percentile(latencies, 99):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Serialization/compression benchmark on a synthetic report the size of a 2-hour upload:
+2400 timeline chunks plus ~18k Deepgram words with timestamps.
+
+    python bench_serialization.py [--minutes 120] [--repeat 20]
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from fast_json import BROTLI_AVAILABLE, BROTLI_QUALITY, GZIP_LEVEL, ORJSON_AVAILABLE, dumps
+
+if BROTLI_AVAILABLE:
+    import brotli
+
+
+def synthetic_report(minutes: int) -> dict:
+    rng = random.Random(0)
+    chunks = minutes * 20
+    words = []
+    t = 0.0
+    for _ in range(minutes * 150):
+        duration = rng.uniform(0.15, 0.6)
+        words.append({"word": rng.choice(["the", "audio", "model", "voice", "detected", "synthetic", "speaker"]),
+                      "start": round(t, 3), "end": round(t + duration, 3), "confidence": rng.random()})
+        t += duration + rng.uniform(0, 0.2)
+    return {
+        "status": "completed",
+        "result": [{"summary_statistics": {"total_clips": chunks}}] + [
+            {"timestamp": i * 3, "confidence": rng.uniform(0.5, 1.0), "prediction": rng.choice(["AI", "Human"])}
+            for i in range(chunks)
+        ],
+        "overall_prediction": "Mixed",
+        "aggregate_confidence": 0.71,
+        "transcription_data": {"text": " ".join(w["word"] for w in words), "words": words,
+                               "average_sentiment": {"sentiment": "neutral", "sentiment_score": 0.02}}
+    }
+
+
+def timed(fn, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        out = fn()
+    return out, (time.process_time() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark report JSON serialization and compression")
+    parser.add_argument("--minutes", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    report = synthetic_report(args.minutes)
+    baseline, baseline_ms = timed(lambda: json.dumps(report).encode(), args.repeat)
+    fast, fast_ms = timed(lambda: dumps(report), args.repeat)
+    print(f"json.dumps (default)      {len(baseline):>10,} bytes  {baseline_ms:8.2f} ms cpu")
+    print(f"fast_json.dumps ({'orjson' if ORJSON_AVAILABLE else 'stdlib compact'}) {len(fast):>10,} bytes  {fast_ms:8.2f} ms cpu")
+
+    for level in sorted({GZIP_LEVEL, 6}):
+        gz, gz_ms = timed(lambda: gzip.compress(fast, compresslevel=level), args.repeat)
+        print(f"gzip level {level}              {len(gz):>10,} bytes  {gz_ms:8.2f} ms cpu")
+    if BROTLI_AVAILABLE:
+        br, br_ms = timed(lambda: brotli.compress(fast, quality=BROTLI_QUALITY), args.repeat)
+        print(f"brotli quality {BROTLI_QUALITY}          {len(br):>10,} bytes  {br_ms:8.2f} ms cpu")
+
+
+if __name__ == "__main__":
+    main()
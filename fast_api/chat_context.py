@@ -0,0 +1,121 @@
+from typing import Dict, List, Optional
+from timeline_codec import job_timeline
+
+# Rough English average; close enough to budget prompts without a tokenizer round-trip
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def format_seconds(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def ai_segments(timeline: List[Dict], clip_seconds: int = 3) -> List[tuple]:
+    """Merge consecutive AI clips of the timeline into (start, end) second ranges"""
+    segments = []
+    for item in timeline:
+        if item.get("prediction") != "AI":
+            continue
+        start = item["timestamp"]
+        if segments and segments[-1][1] == start:
+            segments[-1] = (segments[-1][0], start + clip_seconds)
+        else:
+            segments.append((start, start + clip_seconds))
+    return segments
+
+
+def summarize_analysis(job: Dict, max_segments: int = 8, max_transcript_chars: int = 1200) -> str:
+    """Compact, model-facing description of a finished report: verdict, clip counts, AI ranges, transcript gist"""
+    lines = []
+    result = job.get("result") or []
+    summary = next((item["summary_statistics"] for item in result if "summary_statistics" in item), None)
+    timeline = job_timeline(job)
+
+    if job.get("overall_prediction"):
+        lines.append(f"Verdict: {job['overall_prediction']} (aggregate confidence {job.get('aggregate_confidence', 0):.2f})")
+    if summary:
+        speech = summary["speech_clips"]
+        lines.append(
+            f"Clips: {summary['total_clips']} x 3s; AI {speech['ai_clips']['count']} ({speech['ai_clips']['percentage']:.0f}%), "
+            f"human {speech['human_clips']['count']} ({speech['human_clips']['percentage']:.0f}%)"
+        )
+    if timeline:
+        segments = ai_segments(timeline)
+        if segments:
+            ranges = ", ".join(f"{format_seconds(s)}-{format_seconds(e)}" for s, e in segments[:max_segments])
+            more = f" and {len(segments) - max_segments} more" if len(segments) > max_segments else ""
+            lines.append(f"AI-flagged ranges: {ranges}{more}")
+        else:
+            lines.append("AI-flagged ranges: none")
+
+    transcription = job.get("transcription_data") or {}
+    if transcription:
+        sentiment = transcription.get("average_sentiment") or {}
+        if transcription.get("summary"):
+            lines.append(f"Content summary: {transcription['summary']}")
+        if sentiment.get("sentiment"):
+            lines.append(f"Sentiment: {sentiment['sentiment']} ({sentiment.get('sentiment_score', 0):.2f})")
+        text = transcription.get("text") or ""
+        if text:
+            clipped = text[:max_transcript_chars] + ("..." if len(text) > max_transcript_chars else "")
+            lines.append(f"Transcript ({len(transcription.get('words', []))} words): {clipped}")
+
+    return "\n".join(lines) if lines else "No analysis results are available for this report yet."
+
+
+def compress_turn(turn: Dict, max_chars: int = 160) -> str:
+    content = " ".join(turn["content"].split())
+    if len(content) > max_chars:
+        content = content[:max_chars].rsplit(" ", 1)[0] + "..."
+    return f"{'User asked' if turn['role'] == 'user' else 'Assistant answered'}: {content}"
+
+
+class ChatContextBuilder:
+    """
+    Builds chat prompts within a token budget. Each prompt is a stable prefix (instructions plus the report
+    summary, computed once per job and cached on it) followed by one-line digests of older turns, the most
+    recent turns verbatim, and the new message. Turns move from verbatim to digest as the budget requires.
+    """
+
+    def __init__(self, instructions: str, token_budget: int = 2000, recent_turns: int = 4):
+        self.instructions = instructions.strip()
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+
+    def prefix(self, job: Dict) -> str:
+        # Keyed on status so a summary cached while the report was pending is rebuilt once it completes
+        cached = job.get("chat_prefix")
+        if cached and cached[0] == job.get("status"):
+            return cached[1]
+        prefix = f"{self.instructions}\n\nAnalysis of the user's audio:\n{summarize_analysis(job)}"
+        job["chat_prefix"] = (job.get("status"), prefix)
+        return prefix
+
+    def build(self, job: Dict, message: str, history: Optional[List[Dict]] = None) -> str:
+        history = job.get("chat_history", []) if history is None else history
+        prefix = self.prefix(job)
+        tail = f"New message:\nUser: {message}"
+        remaining = self.token_budget - estimate_tokens(prefix) - estimate_tokens(tail)
+
+        split = max(0, len(history) - self.recent_turns)
+        recent = [f"{'User' if t['role'] == 'user' else 'Assistant'}: {t['content']}" for t in history[split:]]
+        while recent and sum(estimate_tokens(line) for line in recent) > remaining / 2 and split < len(history):
+            recent.pop(0)
+            split += 1
+
+        digests = [compress_turn(turn) for turn in history[:split]]
+        budget_for_digests = remaining - sum(estimate_tokens(line) for line in recent)
+        while digests and sum(estimate_tokens(line) for line in digests) > budget_for_digests:
+            digests.pop(0)
+
+        sections = [prefix]
+        if digests:
+            sections.append("Earlier in this conversation:\n" + "\n".join(digests))
+        if recent:
+            sections.append("Recent conversation:\n" + "\n".join(recent))
+        sections.append(tail)
+        return "\n\n".join(sections)
@@ -0,0 +1,58 @@
+"""
+Bulk export of stored per-chunk fc1 embeddings, without running the model again.
+
+Writes one (total_chunks, 128) float16 .npy matrix plus a JSONL index with a line per file
+({"content_hash", "row", "chunks"}); chunk i of a file is row + i and covers i*3 to i*3+3 seconds.
+
+    python export_embeddings.py --feature-store /data/features -o embeddings.npy
+    python export_embeddings.py --feature-store /data/features --model-version best.pth@0123abcd4567 -o emb.npy
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from feature_store import FeatureStore
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export stored chunk embeddings to a single matrix")
+    parser.add_argument("--feature-store", required=True, help="Feature store directory the embeddings were saved to")
+    parser.add_argument("--model-version", help="Checkpoint version to export (default: the only one stored)")
+    parser.add_argument("-o", "--output", required=True, help="Output .npy; the index is written next to it")
+    args = parser.parse_args(argv)
+
+    store = FeatureStore(args.feature_store)
+    versions = store.embedding_versions()
+    model_version = args.model_version
+    if model_version is None:
+        if len(versions) != 1:
+            parser.error(f"--model-version is required when the store has {len(versions)} versions: {versions}")
+        model_version = versions[0]
+
+    # First pass only reads .npy headers; the second copies rows into a memory-mapped output
+    files = [(content_hash, embeddings.shape) for content_hash, embeddings in store.iter_embeddings(model_version)]
+    if not files:
+        print(f"No embeddings stored for {model_version}")
+        return 1
+    total = sum(shape[0] for _, shape in files)
+    dim = files[0][1][1]
+    matrix = np.lib.format.open_memmap(args.output, mode="w+", dtype=np.float16, shape=(total, dim))
+
+    index_path = os.path.splitext(args.output)[0] + ".index.jsonl"
+    row = 0
+    with open(index_path, "w") as index:
+        for content_hash, _ in files:
+            embeddings = store.get_embeddings(content_hash, model_version)
+            matrix[row:row + len(embeddings)] = embeddings
+            index.write(json.dumps({"content_hash": content_hash, "row": row, "chunks": len(embeddings)}) + "\n")
+            row += len(embeddings)
+    matrix.flush()
+    print(f"Exported {row} chunk embeddings from {len(files)} files ({model_version}) to {args.output}, index {index_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import gzip
+import json
+import os
+from typing import Any, Dict, Optional
+from fastapi.responses import Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '4096'))
+# Low levels: on report-sized payloads they keep most of the size win at a fraction of the CPU
+GZIP_LEVEL = 1
+BROTLI_QUALITY = 4
+
+
+def json_default(obj):
+    """numpy scalars/arrays and torch tensors all expose tolist(); sets and tuples become lists"""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=json_default, separators=(",", ":")).encode("utf-8")
+
+
+def compress(body: bytes, accept_encoding: str, min_bytes: int = COMPRESSION_MIN_BYTES):
+    """Returns (body, content_encoding); bodies under min_bytes or clients without br/gzip get it unchanged"""
+    if len(body) < min_bytes:
+        return body, None
+    accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").lower().split(",")}
+    if BROTLI_AVAILABLE and "br" in accepted:
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
+
+
+def json_response(request, content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """JSON response serialized with dumps() and compressed when large enough and the client accepts it"""
+    body, encoding = compress(dumps(content), request.headers.get("accept-encoding", "") if request else "")
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+import torch
+from typing import Dict, Iterator, Optional, Tuple
+
+
+def hash_file(file_path: str, block_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FeatureStore:
+    """
+    On-disk cache of per-file log-mel features, stored as float16 .npy files and read back memory-mapped.
+
+    Layout: <root>/<config_hash>/<content_hash[:2]>/<content_hash>.npy, with the feature config written
+    next to each config directory so a changed mel setup never reads stale features.
+    Per-chunk fc1 embeddings depend on the checkpoint rather than the mel setup and live under
+    <root>/embeddings/<model_version>/<content_hash[:2]>/<content_hash>.npy as (chunks, 128) float16.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _config_dir(self, feature_config: Dict) -> str:
+        config_json = json.dumps(feature_config, sort_keys=True)
+        config_hash = hashlib.sha256(config_json.encode()).hexdigest()[:16]
+        config_dir = os.path.join(self.root, config_hash)
+        if not os.path.exists(os.path.join(config_dir, "config.json")):
+            os.makedirs(config_dir, exist_ok=True)
+            with open(os.path.join(config_dir, "config.json"), "w") as f:
+                f.write(config_json)
+        return config_dir
+
+    def path_for(self, content_hash: str, feature_config: Dict) -> str:
+        return os.path.join(self._config_dir(feature_config), content_hash[:2], f"{content_hash}.npy")
+
+    def get(self, content_hash: str, feature_config: Dict) -> Optional[np.ndarray]:
+        path = self.path_for(content_hash, feature_config)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, mmap_mode="r")
+        except (ValueError, OSError) as e:
+            print(f"Discarding unreadable cached features {path}: {str(e)}")
+            os.remove(path)
+            return None
+
+    def put(self, content_hash: str, feature_config: Dict, features: torch.Tensor):
+        self._save(self.path_for(content_hash, feature_config), features.detach().to("cpu", torch.float16).numpy())
+
+    def embedding_path(self, content_hash: str, model_version: str) -> str:
+        return os.path.join(self.root, "embeddings", model_version, content_hash[:2], f"{content_hash}.npy")
+
+    def get_embeddings(self, content_hash: str, model_version: str) -> Optional[np.ndarray]:
+        path = self.embedding_path(content_hash, model_version)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode="r")
+
+    def put_embeddings(self, content_hash: str, model_version: str, embeddings: np.ndarray):
+        self._save(self.embedding_path(content_hash, model_version), np.asarray(embeddings, dtype=np.float16))
+
+    def embedding_versions(self):
+        embeddings_dir = os.path.join(self.root, "embeddings")
+        return sorted(os.listdir(embeddings_dir)) if os.path.isdir(embeddings_dir) else []
+
+    def iter_embeddings(self, model_version: str) -> Iterator[Tuple[str, np.ndarray]]:
+        """(content_hash, memory-mapped embeddings) for every file embedded with one checkpoint"""
+        version_dir = os.path.join(self.root, "embeddings", model_version)
+        if not os.path.isdir(version_dir):
+            return
+        for prefix in sorted(os.listdir(version_dir)):
+            for name in sorted(os.listdir(os.path.join(version_dir, prefix))):
+                if name.endswith(".npy"):
+                    yield name[:-4], np.load(os.path.join(version_dir, prefix, name), mmap_mode="r")
+
+    def _save(self, path: str, array: np.ndarray):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so concurrent readers never see a partial array
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, array)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
@@ -0,0 +1,214 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+from scipy.ndimage import maximum_filter
+from typing import Dict, List, Optional, Tuple
+
+# Log-mel frames are 10 ms apart (hop 160 at 16 kHz); each 3 s chunk contributes 300 frames to the grid
+FRAME_SECONDS = 0.01
+FRAMES_PER_CHUNK = 300
+PEAK_NEIGHBORHOOD = (15, 25)    # mel bins x frames
+PEAKS_PER_SECOND = 8
+FAN_OUT = 4
+MAX_DT_FRAMES = 63
+# Hashes this common carry no identity and would make lookups scan huge posting lists
+MAX_POSTINGS = 2000
+
+
+def fingerprint_features(features) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Landmark hashes from log-mel features shaped (chunks, 1, n_mels, frames): spectral peaks are paired
+    with the next FAN_OUT peaks and each pair packed as anchor bin (7 bits) | target bin (7) | frame gap (6).
+    Returns (hashes uint32, anchor frame uint32); both survive re-encoding, gain changes and trimming.
+    """
+    spec = np.asarray(features, dtype=np.float32)[:, 0, :, :FRAMES_PER_CHUNK]
+    spec = spec.transpose(1, 0, 2).reshape(spec.shape[1], -1)
+    if spec.shape[1] == 0:
+        return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.uint32)
+
+    local_max = maximum_filter(spec, size=PEAK_NEIGHBORHOOD, mode="constant", cval=-np.inf)
+    bins, frames = np.nonzero((spec == local_max) & (spec > np.median(spec)))
+    strengths = spec[bins, frames]
+
+    # Keep the strongest PEAKS_PER_SECOND peaks in each second so density does not depend on loudness
+    second = frames // int(1 / FRAME_SECONDS)
+    order = np.lexsort((-strengths, second))
+    bins, frames, second = bins[order], frames[order], second[order]
+    rank = np.arange(len(second)) - np.searchsorted(second, second)
+    keep = rank < PEAKS_PER_SECOND
+    bins, frames = bins[keep], frames[keep]
+
+    order = np.argsort(frames, kind="stable")
+    bins, frames = bins[order].astype(np.uint32), frames[order].astype(np.int64)
+    hashes, anchors = [], []
+    for k in range(1, FAN_OUT + 1):
+        dt = frames[k:] - frames[:-k]
+        valid = (dt > 0) & (dt <= MAX_DT_FRAMES)
+        hashes.append((bins[:-k][valid] << 13) | (bins[k:][valid] << 6) | dt[valid].astype(np.uint32))
+        anchors.append(frames[:-k][valid].astype(np.uint32))
+    return np.concatenate(hashes).astype(np.uint32), np.concatenate(anchors)
+
+
+class FingerprintSegment:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hashes = np.load(os.path.join(directory, "hashes.npy"), mmap_mode="r")
+        self.clips = np.load(os.path.join(directory, "clips.npy"), mmap_mode="r")
+        self.times = np.load(os.path.join(directory, "times.npy"), mmap_mode="r")
+
+
+class FingerprintIndex:
+    """
+    Local near-duplicate index. Postings (hash, clip, anchor frame) are kept in immutable segments of
+    hash-sorted, memory-mapped arrays and searched with searchsorted; new clips collect in memory and
+    become a segment on flush(). Per-clip records (content hash, verdict, chunk scores) live in clips.jsonl.
+
+    Layout: <root>/clips.jsonl, <root>/segments/<n>/{hashes,clips,times}.npy
+    """
+
+    def __init__(self, root: str, flush_postings: int = 200_000):
+        self.root = root
+        self.flush_postings = flush_postings
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(root, "segments"), exist_ok=True)
+        self.records: List[Dict] = []
+        records_path = os.path.join(root, "clips.jsonl")
+        if os.path.exists(records_path):
+            with open(records_path) as f:
+                self.records = [json.loads(line) for line in f if line.strip()]
+        self.segments = [
+            FingerprintSegment(os.path.join(root, "segments", name))
+            for name in sorted(os.listdir(os.path.join(root, "segments")))
+            if os.path.exists(os.path.join(root, "segments", name, "times.npy"))
+        ]
+        self.pending: List[Tuple[np.ndarray, np.ndarray, int]] = []
+        self.pending_postings = 0
+        self.pending_sorted = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record: Dict, hashes: np.ndarray, times: np.ndarray) -> int:
+        with self.lock:
+            clip_id = len(self.records)
+            record = {**record, "clip_id": clip_id, "hash_count": int(len(hashes))}
+            self.records.append(record)
+            with open(os.path.join(self.root, "clips.jsonl"), "a") as f:
+                f.write(json.dumps(record) + "\n")
+            self.pending.append((hashes, times, clip_id))
+            self.pending_postings += len(hashes)
+            self.pending_sorted = None
+            if self.pending_postings >= self.flush_postings:
+                self._flush_locked()
+            return clip_id
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self.pending:
+            return
+        self.segments.append(self._write_segment(*self._sorted_pending()))
+        self.pending = []
+        self.pending_postings = 0
+        self.pending_sorted = None
+
+    def _sorted_pending(self):
+        if self.pending_sorted is None:
+            hashes = np.concatenate([h for h, _, _ in self.pending]).astype(np.uint32)
+            clips = np.concatenate([np.full(len(h), c, dtype=np.uint32) for h, _, c in self.pending])
+            times = np.concatenate([t for _, t, _ in self.pending]).astype(np.uint32)
+            order = np.argsort(hashes, kind="stable")
+            self.pending_sorted = (hashes[order], clips[order], times[order])
+        return self.pending_sorted
+
+    def _write_segment(self, hashes: np.ndarray, clips: np.ndarray, times: np.ndarray) -> FingerprintSegment:
+        segments_dir = os.path.join(self.root, "segments")
+        # Written under a temp name and renamed so a crash never leaves a half-written segment
+        temp_dir = tempfile.mkdtemp(dir=segments_dir, prefix=".tmp")
+        np.save(os.path.join(temp_dir, "hashes.npy"), hashes)
+        np.save(os.path.join(temp_dir, "clips.npy"), clips)
+        np.save(os.path.join(temp_dir, "times.npy"), times)
+        existing = [int(name) for name in os.listdir(segments_dir) if name.isdigit()]
+        segment_dir = os.path.join(segments_dir, f"{max(existing, default=-1) + 1:06d}")
+        os.replace(temp_dir, segment_dir)
+        return FingerprintSegment(segment_dir)
+
+    def compact(self):
+        """Merge all segments (and pending clips) into one, so lookups do a single search per hash"""
+        with self.lock:
+            self._flush_locked()
+            if len(self.segments) < 2:
+                return
+            old_dirs = [s.directory for s in self.segments]
+            hashes = np.concatenate([s.hashes for s in self.segments])
+            order = np.argsort(hashes, kind="stable")
+            merged = self._write_segment(
+                hashes[order],
+                np.concatenate([s.clips for s in self.segments])[order],
+                np.concatenate([s.times for s in self.segments])[order]
+            )
+            self.segments = [merged]
+            for directory in old_dirs:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def _candidates(self, hashes: np.ndarray, times: np.ndarray):
+        """(clip, offset) for every posting sharing a hash with the query"""
+        found_clips, found_offsets = [], []
+        sources = [(s.hashes, s.clips, s.times) for s in self.segments]
+        if self.pending:
+            sources.append(self._sorted_pending())
+        for ref_hashes, ref_clips, ref_times in sources:
+            lo = np.searchsorted(ref_hashes, hashes, side="left")
+            hi = np.searchsorted(ref_hashes, hashes, side="right")
+            counts = hi - lo
+            counts[counts > MAX_POSTINGS] = 0
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            starts = np.repeat(lo, counts)
+            within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            idx = starts + within
+            found_clips.append(np.asarray(ref_clips[idx], dtype=np.int64))
+            found_offsets.append(np.asarray(ref_times[idx], dtype=np.int64) - np.repeat(times.astype(np.int64), counts))
+        if not found_clips:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(found_clips), np.concatenate(found_offsets)
+
+    def lookup(self, hashes: np.ndarray, times: np.ndarray, min_matches: int = 20,
+               min_similarity: float = 0.05) -> Optional[Dict]:
+        """
+        Best near-duplicate of a query fingerprint: the clip with most hashes agreeing on one time offset.
+        similarity is that count over the smaller of the two fingerprints; offset_seconds is where the
+        query starts inside the indexed clip (negative if the query has extra audio in front).
+        """
+        if len(hashes) == 0:
+            return None
+        with self.lock:
+            clips, offsets = self._candidates(hashes, times)
+        if len(clips) == 0:
+            return None
+
+        # Offsets within two frames vote together so small re-encoding jitter does not split the peak
+        binned = offsets // 2
+        keys = (clips << 32) | (binned - binned.min())
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        best = int(np.argmax(counts))
+        matches = int(counts[best])
+        clip_id = int(unique_keys[best] >> 32)
+        record = self.records[clip_id]
+        similarity = matches / max(1, min(len(hashes), record["hash_count"]))
+        if matches < min_matches or similarity < min_similarity:
+            return None
+        offset_frames = int(((unique_keys[best] & 0xFFFFFFFF) + binned.min()) * 2)
+        return {
+            "clip_id": clip_id,
+            "record": record,
+            "matched_hashes": matches,
+            "similarity": round(similarity, 4),
+            "offset_seconds": round(offset_frames * FRAME_SECONDS, 2)
+        }
@@ -0,0 +1,113 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+try:
+    from requests.adapters import HTTPAdapter
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+RANGE_SIZE = 8 * 1024 * 1024
+PARALLEL_THRESHOLD = 16 * 1024 * 1024
+
+download_executor = concurrent.futures.ThreadPoolExecutor(max_workers=int(os.getenv('GCS_DOWNLOAD_WORKERS', '16')))
+
+
+class DownloadStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.downloads = 0
+        self.failures = 0
+        self.total_bytes = 0
+        self.total_seconds = 0.0
+        self.recent = deque(maxlen=100)
+
+    def record(self, size: int, seconds: float, ranges: int):
+        with self.lock:
+            self.downloads += 1
+            self.total_bytes += size
+            self.total_seconds += seconds
+            self.recent.append({"bytes": size, "seconds": round(seconds, 3), "ranges": ranges})
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+
+    def metrics(self) -> Dict:
+        with self.lock:
+            recent_bytes = sum(d["bytes"] for d in self.recent)
+            recent_seconds = sum(d["seconds"] for d in self.recent)
+            return {
+                "downloads": self.downloads,
+                "failures": self.failures,
+                "total_bytes": self.total_bytes,
+                "average_mb_per_second": round(self.total_bytes / self.total_seconds / 1e6, 2) if self.total_seconds else 0.0,
+                "recent_mb_per_second": round(recent_bytes / recent_seconds / 1e6, 2) if recent_seconds else 0.0
+            }
+
+
+download_stats = DownloadStats()
+
+
+def configure_connection_pool(storage_client, pool_size: int = 32):
+    """Let one shared client keep enough keep-alive connections for parallel range requests"""
+    http = getattr(storage_client, "_http", None)
+    if REQUESTS_AVAILABLE and http is not None and hasattr(http, "mount"):
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        http.mount("https://", adapter)
+        http.mount("http://", adapter)
+
+
+def _download_range(blob, dest_path: str, start: int, end: int):
+    data = blob.download_as_bytes(start=start, end=end)
+    fd = os.open(dest_path, os.O_WRONLY)
+    try:
+        os.pwrite(fd, data, start)
+    finally:
+        os.close(fd)
+
+
+def download_blob(storage_client, bucket_name: str, file_name: str, dest_path: str) -> Dict:
+    """
+    Download an object to dest_path. Objects above PARALLEL_THRESHOLD are fetched as concurrent
+    RANGE_SIZE ranges written in place with pwrite; smaller ones in a single request.
+    Runs on the calling thread; use download_blob_async from the event loop.
+    """
+    start_time = time.perf_counter()
+    try:
+        blob = storage_client.bucket(bucket_name).get_blob(file_name)
+        if blob is None:
+            raise FileNotFoundError(f"{bucket_name}/{file_name} not found")
+        size = blob.size or 0
+
+        if size <= PARALLEL_THRESHOLD:
+            blob.download_to_filename(dest_path)
+            ranges = 1
+        else:
+            with open(dest_path, "wb") as f:
+                f.truncate(size)
+            offsets = range(0, size, RANGE_SIZE)
+            futures = [
+                download_executor.submit(_download_range, blob, dest_path, offset, min(size, offset + RANGE_SIZE) - 1)
+                for offset in offsets
+            ]
+            for future in futures:
+                future.result()
+            ranges = len(futures)
+    except Exception:
+        download_stats.record_failure()
+        raise
+
+    elapsed = time.perf_counter() - start_time
+    download_stats.record(size, elapsed, ranges)
+    print(f"Downloaded {file_name}: {size} bytes in {elapsed:.2f}s over {ranges} range(s)")
+    return {"size": size, "seconds": elapsed, "ranges": ranges}
+
+
+async def download_blob_async(storage_client, bucket_name: str, file_name: str, dest_path: str) -> Dict:
+    return await asyncio.to_thread(download_blob, storage_client, bucket_name, file_name, dest_path)
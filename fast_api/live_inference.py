@@ -0,0 +1,195 @@
+import asyncio
+import time
+import numpy as np
+import torch
+import librosa
+from typing import List, Tuple, Optional
+from model_registry import ModelRegistry
+
+try:
+    import opuslib
+    OPUS_AVAILABLE = True
+except ImportError:
+    OPUS_AVAILABLE = False
+    print("opuslib not available, live Opus frames will be rejected")
+
+SUPPORTED_ENCODINGS = ["pcm_s16le", "pcm_f32le", "opus"]
+SAMPLE_WIDTHS = {"pcm_s16le": 2, "pcm_f32le": 4, "opus": 2}
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+# libopus decodes only at these rates
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+class LiveOverloaded(Exception):
+    pass
+
+
+class RingBuffer:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.float32)
+        self.write_pos = 0
+        self.size = 0
+        self.dropped_samples = 0
+
+    def write(self, samples: np.ndarray):
+        if len(samples) >= self.capacity:
+            self.dropped_samples += self.size + len(samples) - self.capacity
+            samples = samples[-self.capacity:]
+            self.buffer[:] = samples
+            self.write_pos = 0
+            self.size = self.capacity
+            return
+
+        overflow = self.size + len(samples) - self.capacity
+        if overflow > 0:
+            self.dropped_samples += overflow
+            self.size -= overflow
+
+        end = self.write_pos + len(samples)
+        if end <= self.capacity:
+            self.buffer[self.write_pos:end] = samples
+        else:
+            split = self.capacity - self.write_pos
+            self.buffer[self.write_pos:] = samples[:split]
+            self.buffer[:end - self.capacity] = samples[split:]
+        self.write_pos = end % self.capacity
+        self.size += len(samples)
+
+    def read(self, n: int) -> np.ndarray:
+        start = (self.write_pos - self.size) % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            out = self.buffer[start:end].copy()
+        else:
+            out = np.concatenate([self.buffer[start:], self.buffer[:end - self.capacity]])
+        self.size -= n
+        return out
+
+
+class LiveAudioSession:
+    """Per-connection state: decodes incoming frames and cuts completed 3 s windows"""
+
+    def __init__(self, encoding: str = "pcm_s16le", sample_rate: int = 16000, target_sr: int = 16000, chunk_duration: int = 3000):
+        if encoding not in SUPPORTED_ENCODINGS:
+            raise ValueError(f"Unsupported encoding: {encoding}. Allowed: {', '.join(SUPPORTED_ENCODINGS)}")
+        if encoding == "opus" and not OPUS_AVAILABLE:
+            raise ValueError("Opus frames are not supported on this server (opuslib not installed)")
+        if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+            raise ValueError(f"sample_rate must be between {MIN_SAMPLE_RATE} and {MAX_SAMPLE_RATE}")
+        if encoding == "opus" and sample_rate not in OPUS_SAMPLE_RATES:
+            raise ValueError(f"Opus sample_rate must be one of {', '.join(map(str, OPUS_SAMPLE_RATES))}")
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.target_sr = target_sr
+        self.window_samples = sample_rate * (chunk_duration // 1000)
+        self.ring = RingBuffer(self.window_samples * 4)
+        self.windows_emitted = 0
+        self.decoder = None
+        if encoding == "opus":
+            try:
+                self.decoder = opuslib.Decoder(sample_rate, 1)
+            except Exception as e:
+                raise ValueError(f"Cannot create Opus decoder: {str(e)}")
+        # PCM frames need not end on a sample boundary; the trailing partial sample waits for the next frame
+        self.partial = b""
+
+    @classmethod
+    def from_config(cls, config) -> "LiveAudioSession":
+        """Session from a client's JSON config message; raises ValueError for anything malformed"""
+        if not isinstance(config, dict):
+            raise ValueError("Config must be a JSON object")
+        try:
+            sample_rate = int(config.get("sample_rate", 16000))
+        except (TypeError, ValueError):
+            raise ValueError("sample_rate must be an integer")
+        return cls(encoding=config.get("encoding", "pcm_s16le"), sample_rate=sample_rate)
+
+    def decode(self, frame: bytes) -> np.ndarray:
+        if self.encoding == "opus":
+            try:
+                frame = self.decoder.decode(frame, self.sample_rate * 120 // 1000)
+            except Exception as e:
+                raise ValueError(f"Invalid Opus frame: {str(e)}")
+        else:
+            frame = self.partial + frame
+            usable = len(frame) - len(frame) % SAMPLE_WIDTHS[self.encoding]
+            frame, self.partial = frame[:usable], frame[usable:]
+        if self.encoding == "pcm_f32le":
+            return np.frombuffer(frame, dtype='<f4').astype(np.float32)
+        return np.frombuffer(frame, dtype='<i2').astype(np.float32) / 32768.0
+
+    def push(self, frame: bytes) -> List[Tuple[int, np.ndarray]]:
+        self.ring.write(self.decode(frame))
+        windows = []
+        while self.ring.size >= self.window_samples:
+            window = self.ring.read(self.window_samples)
+            if self.sample_rate != self.target_sr:
+                window = librosa.resample(window, orig_sr=self.sample_rate, target_sr=self.target_sr)
+            windows.append((self.windows_emitted, window))
+            self.windows_emitted += 1
+        return windows
+
+
+class LiveInferenceBatcher:
+    """
+    Collects completed windows from all connections and scores them in shared batches. The queue is
+    bounded so latency stays bounded under load: when it is full, submit() sheds the window with
+    LiveOverloaded instead of letting every session fall further behind.
+    """
+
+    def __init__(self, model_registry: ModelRegistry, max_batch_size: int = 32, max_wait_ms: int = 50,
+                 max_queue: int = 256):
+        self.model_registry = model_registry
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.worker: Optional[asyncio.Task] = None
+        self.shed_windows = 0
+
+    def start(self):
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._run())
+
+    async def submit(self, window: np.ndarray) -> Tuple[str, float, str]:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((window, future))
+        except asyncio.QueueFull:
+            self.shed_windows += 1
+            raise LiveOverloaded("Live inference is at capacity, window skipped")
+        return await future
+
+    def _score(self, windows: List[np.ndarray]) -> List[Tuple[str, float, str]]:
+        with self.model_registry.lease() as generation:
+            inference = generation.detector
+            batch = inference.prepare_batch([torch.FloatTensor(window).unsqueeze(0) for window in windows])
+            return [(pred, conf, generation.version) for pred, conf in inference.predict_batch(batch)]
+
+    async def _run(self):
+        while True:
+            items = [await self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(items) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            items = [(window, future) for window, future in items if not future.cancelled()]
+            if not items:
+                continue
+            try:
+                scores = await asyncio.to_thread(self._score, [window for window, _ in items])
+                for (_, future), score in zip(items, scores):
+                    if not future.done():
+                        future.set_result(score)
+            except Exception as e:
+                print(f"Live inference batch failed: {str(e)}")
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
@@ -19,12 +19,21 @@ class DeepfakeDetectorCNN(nn.Module):
         self.fc1 = nn.Linear(self.fc_input_size, 128)
         self.fc2 = nn.Linear(128, 1)
 
-    def forward(self, x):
+    def embed(self, x):
+        """128-d fc1 activation per input, the layer the classifier head reads from"""
         x = self.pool1(F.relu(self.bn1(self.conv1(x))))
         x = self.pool2(F.relu(self.bn2(self.conv2(x))))
         x = self.pool3(F.relu(self.bn3(self.conv3(x))))
         x = x.view(-1, self.fc_input_size)
-        x = F.relu(self.fc1(x))
+        return F.relu(self.fc1(x))
+
+    def forward(self, x):
+        x = self.embed(x)
         x = self.fc2(x)
         x = torch.sigmoid(x)
-        return x
\ No newline at end of file
+        return x
+
+    def forward_with_embedding(self, x) -> Tuple[torch.Tensor, torch.Tensor]:
+        """(P(AI) shaped (B, 1), fc1 embedding shaped (B, 128)) from one pass"""
+        embedding = self.embed(x)
+        return torch.sigmoid(self.fc2(embedding)), embedding
\ No newline at end of file
@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import torch
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+
+def checkpoint_version(model_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return f"{os.path.basename(model_path)}@{digest.hexdigest()[:12]}"
+
+
+class ModelGeneration:
+    def __init__(self, inference, model_path: str, version: str):
+        self.inference = inference
+        # EnsembleInference wraps the primary AudioInference; batch/live paths need the plain detector
+        self.detector = getattr(inference, "inference", inference)
+        self.model_path = model_path
+        self.version = version
+        self.loaded_at = time.time()
+        self.in_flight = 0
+
+
+class ModelRegistry:
+    """
+    Holds the checkpoint shared by every request. reload() loads and warms a new checkpoint off the
+    event loop, swaps it in atomically, and lets requests already holding the old one finish on it.
+    """
+
+    def __init__(self, build_inference: Callable[[str], object], model_path: str):
+        self.build_inference = build_inference
+        self.model_path = model_path
+        self.current: Optional[ModelGeneration] = None
+        self.draining: Dict[str, ModelGeneration] = {}
+        self.lock = threading.Lock()
+        self.initial_load_lock = threading.Lock()
+        self.reload_lock = asyncio.Lock()
+        self.last_mtime = None
+
+    def _load(self, model_path: str) -> ModelGeneration:
+        version = checkpoint_version(model_path)
+        inference = self.build_inference(model_path)
+        detector = getattr(inference, "inference", inference)
+        warmup = detector.prepare_batch([torch.zeros(1, detector.target_sr * (detector.chunk_duration // 1000))])
+        detector.predict_batch(warmup)
+        print(f"Loaded and warmed model checkpoint {version}")
+        return ModelGeneration(inference, model_path, version)
+
+    def ensure_loaded(self):
+        if self.current is not None:
+            return
+        with self.initial_load_lock:
+            if self.current is None:
+                generation = self._load(self.model_path)
+                with self.lock:
+                    self.current = generation
+                    self.last_mtime = os.path.getmtime(self.model_path)
+
+    @contextmanager
+    def lease(self):
+        """Pin the current checkpoint for the duration of one unit of work"""
+        self.ensure_loaded()
+        with self.lock:
+            generation = self.current
+            generation.in_flight += 1
+        try:
+            yield generation
+        finally:
+            with self.lock:
+                generation.in_flight -= 1
+                if generation is not self.current and generation.in_flight == 0:
+                    self.draining.pop(generation.version, None)
+                    print(f"Drained model checkpoint {generation.version}")
+
+    async def reload(self, model_path: Optional[str] = None) -> Dict:
+        async with self.reload_lock:
+            model_path = model_path or self.model_path
+            generation = await asyncio.to_thread(self._load, model_path)
+            with self.lock:
+                previous = self.current
+                self.current = generation
+                self.model_path = model_path
+                self.last_mtime = os.path.getmtime(model_path)
+                if previous is not None and previous.in_flight > 0:
+                    self.draining[previous.version] = previous
+            return {
+                "version": generation.version,
+                "previous_version": previous.version if previous else None,
+                "draining_in_flight": previous.in_flight if previous else 0
+            }
+
+    async def watch(self, interval_seconds: float):
+        """Reload whenever the checkpoint file at model_path is replaced"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                mtime = os.path.getmtime(self.model_path)
+                if self.last_mtime is not None and mtime != self.last_mtime:
+                    print(f"Checkpoint {self.model_path} changed on disk, reloading")
+                    await self.reload()
+            except Exception as e:
+                print(f"Model watch reload failed: {str(e)}")
+
+    def status(self) -> Dict:
+        with self.lock:
+            return {
+                "model_path": self.model_path,
+                "version": self.current.version if self.current else None,
+                "loaded_at": self.current.loaded_at if self.current else None,
+                "in_flight": self.current.in_flight if self.current else 0,
+                "draining": {version: g.in_flight for version, g in self.draining.items()}
+            }
@@ -0,0 +1,281 @@
+"""
+Offline bulk scanner: runs AudioInference over a directory tree or a manifest
+of audio paths without the web server.
+
+    python scan_cli.py /data/archive -o results.jsonl --workers 8
+    python scan_cli.py manifest.txt -o results.csv --resume
+    python scan_cli.py /data/archive -o results.jsonl --feature-store /data/features --embeddings
+"""
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Set
+
+import numpy as np
+import torch
+
+from audio_processor import AudioInference, load_audio_chunks, SAMPLE_RATE, CLIP_DURATION
+from feature_store import FeatureStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".flac", ".ogg")
+OUTPUT_FIELDS = [
+    "path", "status", "overall_prediction", "aggregate_confidence", "percent_ai",
+    "total_chunks", "ai_chunks", "human_chunks", "confidences", "predictions", "error"
+]
+
+
+def find_audio_files(source: str) -> List[str]:
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    paths.append(os.path.join(root, name))
+        return sorted(paths)
+
+    with open(source) as manifest:
+        paths = [line.strip() for line in manifest if line.strip() and not line.startswith("#")]
+    # A path listed twice would be scored twice under one key, corrupting the per-file bookkeeping
+    return list(dict.fromkeys(paths))
+
+
+def decode_worker(path: str) -> np.ndarray:
+    chunks = load_audio_chunks(path, SAMPLE_RATE, CLIP_DURATION * 1000)
+    if not chunks:
+        return np.zeros((0, SAMPLE_RATE * CLIP_DURATION), dtype=np.float32)
+    return torch.cat(chunks).numpy()
+
+
+def decode_in_parallel(paths: List[str], workers: int) -> Iterator:
+    """Yield (path, chunks) in submission order while keeping a bounded number of decodes in flight"""
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = []
+        path_iter = iter(paths)
+        for path in path_iter:
+            in_flight.append((path, pool.submit(decode_worker, path)))
+            if len(in_flight) >= workers * 2:
+                break
+
+        while in_flight:
+            path, future = in_flight.pop(0)
+            try:
+                stacked = future.result()
+                chunks = [torch.from_numpy(row).unsqueeze(0) for row in stacked]
+                yield path, chunks
+            except Exception as e:
+                yield path, e
+            next_path = next(path_iter, None)
+            if next_path is not None:
+                in_flight.append((next_path, pool.submit(decode_worker, next_path)))
+
+
+def featurize_with_store(inference: AudioInference, paths: List[str], workers: int,
+                         content_hashes: Optional[Dict[str, str]] = None) -> Iterator:
+    """
+    Yield cached features first, then decode the misses in parallel and add them to the store.
+    Each path's content hash is recorded in content_hashes when given.
+    """
+    misses = {}
+    for path in paths:
+        try:
+            content_hash, cached = inference.lookup_features(path)
+        except Exception as e:
+            yield path, e
+            continue
+        if content_hashes is not None:
+            content_hashes[path] = content_hash
+        if cached is not None:
+            yield path, cached
+        else:
+            misses[path] = content_hash
+
+    for path, chunks in decode_in_parallel(list(misses), workers):
+        if isinstance(chunks, Exception):
+            yield path, chunks
+            continue
+        features = inference.featurize_chunks(chunks)
+        inference.feature_store.put(misses[path], inference.feature_config, features)
+        yield path, features
+
+
+def to_row(path: str, results: Dict) -> Dict:
+    if results.get("status") == "error":
+        return {"path": path, "status": "error", "error": results.get("error")}
+    return {
+        "path": path,
+        "status": "success",
+        "overall_prediction": results["overall_prediction"],
+        "aggregate_confidence": round(results["aggregate_confidence"], 6),
+        "percent_ai": round(results["percent_ai"], 4),
+        "total_chunks": results["total_chunks"],
+        "ai_chunks": results["ai_chunks"],
+        "human_chunks": results["human_chunks"],
+        "confidences": [round(c, 6) for c in results["confidences"]],
+        "predictions": "".join("A" if p == "AI" else "H" for p in results["predictions"]),
+        "error": None
+    }
+
+
+def read_jsonl_rows(path: str) -> List[Dict]:
+    """Rows of a JSONL file, truncating a line cut off by an interrupted run so it can be appended to"""
+    rows = []
+    valid_bytes = 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+            valid_bytes += len(line)
+    with open(path, "r+b") as f:
+        f.truncate(valid_bytes)
+    return rows
+
+
+class ResultWriter:
+    """
+    Appends one row per file and flushes immediately so partial output survives interruption.
+    Parquet cannot be appended to and is unreadable until its footer is written, so parquet rows are
+    journalled to <output>.journal.jsonl and the .parquet file is (re)written atomically on close().
+    """
+
+    def __init__(self, output_path: str, output_format: str, resume: bool):
+        self.output_path = output_path
+        self.output_format = output_format
+        self.resume = resume
+        self.done: Set[str] = set()
+        existing_rows = []
+
+        if output_format == "parquet":
+            self.journal_path = output_path + ".journal.jsonl"
+        if resume:
+            existing_rows = self._read_existing()
+            self.done = {row["path"] for row in existing_rows}
+
+        if output_format == "jsonl":
+            self.handle = open(output_path, "a" if resume else "w")
+        elif output_format == "csv":
+            write_header = not (resume and os.path.exists(output_path) and os.path.getsize(output_path) > 0)
+            self.handle = open(output_path, "a" if resume else "w", newline="")
+            self.csv_writer = csv.DictWriter(self.handle, fieldnames=OUTPUT_FIELDS)
+            if write_header:
+                self.csv_writer.writeheader()
+        elif output_format == "parquet":
+            if not PARQUET_AVAILABLE:
+                raise RuntimeError("Parquet output requires pyarrow")
+            self.schema = pa.schema([
+                ("path", pa.string()), ("status", pa.string()), ("overall_prediction", pa.string()),
+                ("aggregate_confidence", pa.float64()), ("percent_ai", pa.float64()),
+                ("total_chunks", pa.int64()), ("ai_chunks", pa.int64()), ("human_chunks", pa.int64()),
+                ("confidences", pa.list_(pa.float32())), ("predictions", pa.string()), ("error", pa.string())
+            ])
+            self.handle = open(self.journal_path, "a" if resume else "w")
+        else:
+            raise ValueError(f"Unsupported output format: {output_format}")
+
+    def _read_existing(self) -> List[Dict]:
+        if self.output_format == "jsonl":
+            return read_jsonl_rows(self.output_path) if os.path.exists(self.output_path) else []
+        if self.output_format == "csv":
+            if not os.path.exists(self.output_path):
+                return []
+            # Drop a row cut off by an interrupted run; every complete row ends with a newline
+            with open(self.output_path, "r+b") as f:
+                data = f.read()
+                f.truncate(data.rfind(b"\n") + 1)
+            with open(self.output_path, newline="") as f:
+                return list(csv.DictReader(f))
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("Parquet output requires pyarrow")
+        return self._parquet_rows()
+
+    def _parquet_rows(self) -> List[Dict]:
+        """Rows of the last completed .parquet plus the journal of the run since, latest row per path winning"""
+        rows = pq.read_table(self.output_path).to_pylist() if self.resume and os.path.exists(self.output_path) else []
+        if os.path.exists(self.journal_path):
+            rows += read_jsonl_rows(self.journal_path)
+        return list({row["path"]: row for row in rows}.values())
+
+    def write(self, row: Dict):
+        if self.output_format == "csv":
+            self.csv_writer.writerow({**row, "confidences": json.dumps(row.get("confidences"))})
+        else:
+            self.handle.write(json.dumps(row) + "\n")
+        self.handle.flush()
+
+    def close(self):
+        self.handle.close()
+        if self.output_format == "parquet":
+            temp_path = self.output_path + ".tmp"
+            pq.write_table(pa.Table.from_pylist(self._parquet_rows(), schema=self.schema), temp_path)
+            os.replace(temp_path, self.output_path)
+            os.remove(self.journal_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan audio files for AI-generated speech")
+    parser.add_argument("source", help="Directory to scan recursively, or a manifest file with one path per line")
+    parser.add_argument("-o", "--output", required=True, help="Output file (.jsonl, .csv or .parquet)")
+    parser.add_argument("--format", choices=["jsonl", "csv", "parquet"], help="Output format (default: from extension)")
+    parser.add_argument("--model-path", default="./best_best_85_balanced.pth")
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="Decoder processes")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per inference batch, shared across files")
+    parser.add_argument("--resume", action="store_true", help="Skip files already present in the output")
+    parser.add_argument("--feature-store", help="Directory of cached log-mel features; reuses them instead of decoding")
+    parser.add_argument("--embeddings", action="store_true",
+                        help="Also save per-chunk fc1 embeddings to the feature store (see export_embeddings.py)")
+    args = parser.parse_args(argv)
+    if args.embeddings and not args.feature_store:
+        parser.error("--embeddings needs --feature-store")
+
+    output_format = args.format or os.path.splitext(args.output)[1].lstrip(".").lower()
+    writer = ResultWriter(args.output, output_format, args.resume)
+
+    paths = [p for p in find_audio_files(args.source) if p not in writer.done]
+    print(f"Found {len(paths) + len(writer.done)} files, {len(writer.done)} already done, {len(paths)} to scan")
+    if not paths:
+        writer.close()
+        return 0
+
+    feature_store = FeatureStore(args.feature_store) if args.feature_store else None
+    inference = AudioInference(model_path=args.model_path, device=args.device, feature_store=feature_store,
+                               store_embeddings=args.embeddings)
+    content_hashes = {}
+    start_time = time.time()
+    completed = 0
+
+    def on_file_done(path, results):
+        nonlocal completed
+        if "embeddings" in results:
+            inference.save_embeddings(content_hashes.pop(path), results.pop("embeddings"))
+        writer.write(to_row(path, results))
+        completed += 1
+        if completed % 100 == 0 or completed == len(paths):
+            elapsed = time.time() - start_time
+            print(f"{completed}/{len(paths)} files ({completed / elapsed:.1f} files/s)")
+
+    try:
+        if feature_store is not None:
+            inference.analyze_features(featurize_with_store(inference, paths, args.workers, content_hashes),
+                                       args.batch_size, on_file_done, with_embeddings=args.embeddings)
+        else:
+            inference.analyze_decoded(decode_in_parallel(paths, args.workers), args.batch_size, on_file_done)
+    finally:
+        writer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import torch
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# A speaker must cover this much of a window to count as present in it
+MIN_SPEAKER_OVERLAP_SECONDS = 0.5
+
+
+def speaker_turns(transcription: Optional[Dict]) -> List[Tuple[float, float, int]]:
+    """(start, end, speaker) turns from diarized utterances, or from word labels if utterances lack them"""
+    transcription = transcription or {}
+    spans = [u for u in transcription.get("utterances", []) if u.get("speaker") is not None]
+    if not spans:
+        spans = [w for w in transcription.get("words", []) if w.get("speaker") is not None]
+    turns = []
+    for span in sorted(spans, key=lambda s: s["start"]):
+        if turns and turns[-1][2] == span["speaker"]:
+            turns[-1] = (turns[-1][0], max(turns[-1][1], span["end"]), span["speaker"])
+        else:
+            turns.append((span["start"], span["end"], span["speaker"]))
+    return turns
+
+
+def window_speakers(turns: Sequence[Tuple[float, float, int]], num_windows: int, hop_seconds: float) -> List[Dict[int, float]]:
+    """Seconds of speech per speaker inside each window, from one sweep over the sorted turns"""
+    windows = []
+    first = 0
+    for i in range(num_windows):
+        start, end = i * hop_seconds, (i + 1) * hop_seconds
+        while first < len(turns) and turns[first][1] <= start:
+            first += 1
+        overlaps: Dict[int, float] = {}
+        t = first
+        while t < len(turns) and turns[t][0] < end:
+            overlap = min(end, turns[t][1]) - max(start, turns[t][0])
+            if overlap > 0:
+                overlaps[turns[t][2]] = overlaps.get(turns[t][2], 0.0) + overlap
+            t += 1
+        windows.append({s: o for s, o in overlaps.items() if o >= MIN_SPEAKER_OVERLAP_SECONDS})
+    return windows
+
+
+def speaker_clip_start(turns: Sequence[Tuple[float, float, int]], speaker: int, window_start: float,
+                       clip_seconds: float, total_seconds: float) -> float:
+    """
+    Start (seconds) of a clip_seconds slice for one speaker near a boundary window: shifted into that
+    speaker's longest overlapping turn where it fits, and kept inside the scored audio.
+    """
+    window_end = window_start + clip_seconds
+    own = [t for t in turns if t[2] == speaker and t[1] > window_start and t[0] < window_end]
+    turn_start, turn_end, _ = max(own, key=lambda t: min(window_end, t[1]) - max(window_start, t[0]))
+    clip_start = min(max(window_start, turn_start), max(turn_start, turn_end - clip_seconds))
+    return max(0.0, min(clip_start, total_seconds - clip_seconds))
+
+
+def mask_speaker(clip: torch.Tensor, sample_rate: int, turns: Sequence[Tuple[float, float, int]],
+                 speaker: int, clip_start: float) -> torch.Tensor:
+    """A (1, samples) clip starting at clip_start seconds with every sample outside the speaker's turns silenced"""
+    clip_seconds = clip.shape[-1] / sample_rate
+    mask = torch.zeros_like(clip)
+    for start, end, label in turns:
+        if label == speaker and end > clip_start and start < clip_start + clip_seconds:
+            lo = max(0, int((start - clip_start) * sample_rate))
+            hi = min(clip.shape[-1], int((end - clip_start) * sample_rate))
+            mask[..., lo:hi] = 1.0
+    return clip * mask
+
+
+def score_speakers(inference, file_path: str, transcription: Optional[Dict], predictions: List[str],
+                   confidences: List[float], batch_size: int = 16) -> Optional[Dict]:
+    """
+    Per-speaker detection scores for a diarized report. Windows covered by a single speaker reuse their
+    existing score; only windows where two or more speakers overlap are decoded again and re-scored, once
+    per speaker on that speaker's audio alone. Only the clip ranges of those windows are decoded, not
+    the whole file. Returns None when fewer than two speakers were detected.
+    """
+    turns = speaker_turns(transcription)
+    if len({t[2] for t in turns}) < 2:
+        return None
+
+    hop_seconds = inference.chunk_duration / 1000
+    windows = window_speakers(turns, len(predictions), hop_seconds)
+    scores: Dict[int, List[Tuple[float, float, bool]]] = {}
+    boundary = []
+    for i, speakers in enumerate(windows):
+        if len(speakers) == 1:
+            speaker, seconds = next(iter(speakers.items()))
+            p_ai = confidences[i] if predictions[i] == "AI" else 1 - confidences[i]
+            scores.setdefault(speaker, []).append((p_ai, seconds, False))
+        elif len(speakers) > 1:
+            boundary.extend((i, speaker, seconds) for speaker, seconds in speakers.items())
+
+    if boundary:
+        total_seconds = len(predictions) * hop_seconds
+        starts = [
+            speaker_clip_start(turns, speaker, i * hop_seconds, hop_seconds, total_seconds)
+            for i, speaker, _ in boundary
+        ]
+        audio = inference.load_audio_ranges(file_path, [(start, hop_seconds) for start in starts])
+        clips = [
+            mask_speaker(clip, inference.target_sr, turns, speaker, start)
+            for clip, start, (_, speaker, _) in zip(audio, starts, boundary)
+        ]
+        probabilities = []
+        for start in range(0, len(clips), batch_size):
+            probabilities.extend(inference.predict_probabilities(inference.prepare_batch(clips[start:start + batch_size])))
+        for (i, speaker, seconds), p_ai in zip(boundary, probabilities):
+            scores.setdefault(speaker, []).append((p_ai, seconds, True))
+
+    speakers = []
+    for speaker in sorted(scores):
+        entries = scores[speaker]
+        labelled = [inference._label_probability(p) for p, _, _ in entries]
+        summary = inference.summarize_predictions([label for label, _ in labelled], [conf for _, conf in labelled])
+        weight = sum(seconds for _, seconds, _ in entries)
+        speakers.append({
+            "speaker": speaker,
+            "speech_seconds": round(sum(end - start for start, end, label in turns if label == speaker), 2),
+            "windows": len(entries),
+            "rescored_windows": sum(1 for _, _, rescored in entries if rescored),
+            "ai_probability": round(sum(p * seconds for p, seconds, _ in entries) / weight, 4),
+            "max_ai_probability": round(max(p for p, _, _ in entries), 4),
+            "percent_ai": summary["percent_ai"],
+            "overall_prediction": summary["overall_prediction"]
+        })
+
+    return {
+        "speakers": speakers,
+        "turns": len(turns),
+        "boundary_windows": len({i for i, _, _ in boundary})
+    }
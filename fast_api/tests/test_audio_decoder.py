@@ -0,0 +1,65 @@
+import shutil
+import subprocess
+
+import pytest
+
+np = pytest.importorskip("numpy")
+librosa = pytest.importorskip("librosa")
+pytest.importorskip("torch")
+
+from audio_decoder import FFMPEG_BINARY, decode_ffmpeg, decoder_pool  # noqa: E402
+from audio_processor import CLIP_SAMPLES, SAMPLE_RATE  # noqa: E402
+from bench_decode import FORMATS, aligned_snr, librosa_decode  # noqa: E402
+
+pytestmark = pytest.mark.skipif(shutil.which(FFMPEG_BINARY) is None, reason="ffmpeg not installed")
+
+# Lossy codecs are compared after decoding with two different decoders and resamplers, so the bound
+# is on agreement between paths, not on codec quality
+MIN_SNR_DB = {"wav": 40.0, "flac": 40.0, "mp3": 25.0, "m4a": 25.0, "ogg": 25.0}
+
+
+@pytest.fixture(scope="module")
+def fixtures(tmp_path_factory):
+    """10 s of 44.1 kHz stereo tones plus noise, encoded in every supported format"""
+    directory = tmp_path_factory.mktemp("decode")
+    source = "aevalsrc=0.3*sin(2*PI*440*t)+0.05*random(0)|0.3*sin(2*PI*660*t)+0.05*random(1):s=44100:d=10"
+    paths = {}
+    for extension, codec in FORMATS.items():
+        path = directory / f"fixture.{extension}"
+        result = subprocess.run([FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi", "-i", source, *codec, str(path)])
+        if result.returncode == 0:
+            paths[extension] = str(path)
+    return paths
+
+
+@pytest.mark.parametrize("extension", sorted(FORMATS))
+def test_ffmpeg_matches_librosa(fixtures, extension):
+    if extension not in fixtures:
+        pytest.skip(f"ffmpeg build cannot encode {extension}")
+    reference = librosa_decode(fixtures[extension])
+    decoded = decode_ffmpeg(fixtures[extension], SAMPLE_RATE)
+
+    assert decoded.dtype == np.float32
+    snr, lag = aligned_snr(reference, decoded)
+    assert snr >= MIN_SNR_DB[extension]
+    # Decoders differ only in priming/padding trimmed at the ends, never by whole chunks
+    assert abs(len(reference) - len(decoded)) < SAMPLE_RATE // 2
+    assert abs(len(reference) // CLIP_SAMPLES - len(decoded) // CLIP_SAMPLES) <= 1
+
+
+def test_pool_returns_same_samples_as_direct_decode(fixtures):
+    path = fixtures["wav"]
+    assert np.array_equal(decoder_pool.decode(path), decode_ffmpeg(path, SAMPLE_RATE))
+
+
+@pytest.mark.parametrize("extension", ["wav", "flac"])
+def test_ranged_decode_matches_slice_of_full_decode(fixtures, extension):
+    if extension not in fixtures:
+        pytest.skip(f"ffmpeg build cannot encode {extension}")
+    full = decode_ffmpeg(fixtures[extension], SAMPLE_RATE)
+    part = decode_ffmpeg(fixtures[extension], SAMPLE_RATE, start=4.0, duration=3.0)
+
+    assert abs(len(part) - 3 * SAMPLE_RATE) <= 16
+    snr, lag = aligned_snr(full[4 * SAMPLE_RATE:4 * SAMPLE_RATE + len(part)], part)
+    assert snr >= MIN_SNR_DB[extension]
+    assert abs(lag) <= 16
@@ -0,0 +1,39 @@
+import io
+import struct
+
+import pytest
+
+from audio_probe import choose_analysis_path, probe_audio
+
+
+def wav_bytes(channels=2, sample_rate=16000, bits=16, block_align=None, audio_format=1, frames=1600) -> bytes:
+    block_align = channels * bits // 8 if block_align is None else block_align
+    data = b"\x00" * (frames * channels * bits // 8)
+    fmt = struct.pack("<HHIIHH", audio_format, channels, sample_rate, sample_rate * block_align, block_align, bits)
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+@pytest.mark.parametrize("header", [
+    {},
+    {"channels": 1},
+    {"bits": 32, "audio_format": 3},
+], ids=["s16-stereo", "s16-mono", "f32-stereo"])
+def test_pcm_wav_takes_fast_path(header):
+    assert choose_analysis_path(probe_audio(io.BytesIO(wav_bytes(**header)))) == "fast"
+
+
+@pytest.mark.parametrize("header", [
+    {"block_align": 0},
+    {"block_align": 3},
+    {"block_align": 2},
+    {"channels": 0, "block_align": 2},
+    {"sample_rate": 0},
+    {"bits": 24},
+], ids=["zero-block-align", "odd-block-align", "mono-block-align-for-stereo", "no-channels", "zero-rate", "s24"])
+def test_malformed_or_unsupported_wav_takes_full_path(header):
+    assert choose_analysis_path(probe_audio(io.BytesIO(wav_bytes(**header)))) == "full"
+
+
+def test_unprobed_input_takes_full_path():
+    assert choose_analysis_path(None) == "full"
@@ -0,0 +1,15 @@
+from transcript_index import limit_utterance_text
+
+
+def test_limited_utterances_share_the_preview_budget():
+    utterances = [
+        {"start": 0.0, "end": 2.0, "transcript": "a" * 150, "ai_probability": 0.1},
+        {"start": 2.0, "end": 60.0, "transcript": "b" * 500, "words": [{"word": "b"}], "ai_probability": 0.9},
+        {"start": 60.0, "end": 61.0, "transcript": "c" * 10, "ai_probability": 0.2},
+    ]
+    limited = limit_utterance_text(utterances, 200)
+
+    assert [u["transcript"] for u in limited] == ["a" * 150, "b" * 50 + "...", "..."]
+    assert all("words" not in u for u in limited)
+    assert [u["ai_probability"] for u in limited] == [0.1, 0.9, 0.2]
+    assert len(utterances[1]["transcript"]) == 500
@@ -0,0 +1,113 @@
+import os
+import struct
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("magic")
+
+from upload_validation import LocalBlob, LocalBlobStore, validate_blob  # noqa: E402
+
+BUCKET = "uploads"
+QUARANTINE = "quarantine"
+
+
+def wav_bytes(seconds: float = 1.0, sample_rate: int = 16000) -> bytes:
+    data = b"\x00\x00" * int(seconds * sample_rate)
+    fmt = struct.pack("<HHIIHH", 1, 1, sample_rate, sample_rate * 2, 2, 16)
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def mp3_bytes(frames: int = 40) -> bytes:
+    # MPEG-1 layer III, 128 kbps, 44.1 kHz, mono: 417-byte frames
+    frame = b"\xff\xfb\x90\xc4" + b"\x00" * 413
+    return b"ID3\x03\x00\x00\x00\x00\x00\x00" + frame * frames
+
+
+def atom(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(body)) + kind + body
+
+
+def m4a_bytes(codec: bytes = b"mp4a") -> bytes:
+    mvhd = atom(b"mvhd", b"\x00" * 12 + struct.pack(">II", 1000, 5000) + b"\x00" * 80)
+    entry = atom(codec, b"\x00" * 6 + struct.pack(">H", 1) + b"\x00" * 8 + struct.pack(">HHHHI", 2, 16, 0, 0, 44100 << 16))
+    stsd = atom(b"stsd", struct.pack(">II", 0, 1) + entry)
+    trak = atom(b"trak", atom(b"mdia", atom(b"minf", atom(b"stbl", stsd))))
+    ftyp = atom(b"ftyp", b"M4A \x00\x00\x00\x00M4A mp42isom")
+    return ftyp + atom(b"moov", mvhd + trak) + atom(b"mdat", b"\x00" * 4096)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalBlobStore(str(tmp_path))
+
+
+def upload(store, name: str, data: bytes):
+    store.bucket(BUCKET).blob(name).upload_from_string(data)
+
+
+@pytest.mark.parametrize("name, data", [
+    ("clip.wav", wav_bytes()),
+    ("clip.mp3", mp3_bytes()),
+    ("clip.m4a", m4a_bytes()),
+], ids=["wav", "mp3", "m4a"])
+def test_accepts_audio(store, name, data):
+    upload(store, name, data)
+    result = validate_blob(store, BUCKET, name, QUARANTINE)
+
+    assert result["status"] == "valid"
+    assert store.bucket(BUCKET).get_blob(name) is not None
+    assert store.bucket(QUARANTINE).get_blob(name) is None
+
+
+@pytest.mark.parametrize("name, data", [
+    ("clip.wav", b"#!/bin/sh\necho not audio\n" * 20),
+    ("clip.mp3", b"%PDF-1.4\n" + b"\x00" * 512),
+    ("clip.m4a", m4a_bytes(codec=b"avc1")),
+], ids=["script-as-wav", "pdf-as-mp3", "video-m4a"])
+def test_quarantines_non_audio(store, name, data):
+    upload(store, name, data)
+    result = validate_blob(store, BUCKET, name, QUARANTINE)
+
+    assert result["status"] == "quarantined"
+    assert store.bucket(BUCKET).get_blob(name) is None
+    assert store.bucket(QUARANTINE).get_blob(name).download_as_bytes() == data
+
+
+def test_quarantine_copies_before_deleting(store, monkeypatch):
+    name = "clip.wav"
+    upload(store, name, b"not audio at all\n" * 20)
+    events = []
+    delete = LocalBlob.delete
+
+    def recording_delete(blob):
+        # The quarantine copy must already be complete when the original goes away
+        events.append(("delete", store.bucket(QUARANTINE).get_blob(name) is not None))
+        delete(blob)
+
+    monkeypatch.setattr(LocalBlob, "delete", recording_delete)
+    validate_blob(store, BUCKET, name, QUARANTINE)
+
+    assert events == [("delete", True)]
+
+
+def test_skips_non_audio_extensions_and_missing_blobs(store):
+    upload(store, "notes.txt", b"hello")
+
+    assert validate_blob(store, BUCKET, "notes.txt", QUARANTINE)["status"] == "skipped"
+    assert validate_blob(store, BUCKET, "absent.wav", QUARANTINE)["status"] == "missing"
+    assert store.bucket(BUCKET).get_blob("notes.txt") is not None
+
+
+def test_local_blob_reports_fresh_metadata_and_new_generation_on_rewrite(store):
+    blob = store.bucket(BUCKET).blob("clip.wav")
+    assert blob.generation is None and blob.metadata is None
+
+    blob.upload_from_string(wav_bytes())
+    created = datetime.fromisoformat(blob.metadata["timeCreated"].replace("Z", "+00:00"))
+    assert abs((datetime.now(timezone.utc) - created).total_seconds()) < 60
+
+    first = blob.generation
+    os.utime(blob.path, ns=(first + 1_000_000, first + 1_000_000))
+    assert blob.generation != first
@@ -0,0 +1,61 @@
+import base64
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+TIMELINE_FORMAT = "compact-v1"
+
+
+def _b64(array: np.ndarray) -> str:
+    return base64.b64encode(array.tobytes()).decode("ascii")
+
+
+def run_length_segments(is_ai: np.ndarray) -> List[List[int]]:
+    """[[start_index, length, is_ai], ...] for each run of identical predictions"""
+    if len(is_ai) == 0:
+        return []
+    boundaries = np.flatnonzero(np.diff(is_ai)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(is_ai)]))
+    return [[int(s), int(e - s), int(is_ai[s])] for s, e in zip(starts, ends)]
+
+
+def encode_timeline(predictions: Sequence[str], confidences: Sequence[float], hop_seconds: float = 3,
+                    start_seconds: float = 0) -> Dict:
+    """
+    Columnar form of a per-chunk timeline: chunk i starts at start + i * hop, confidences are
+    little-endian float16 and predictions a bit-packed AI mask (MSB first), both base64 encoded.
+    """
+    is_ai = np.fromiter((p == "AI" for p in predictions), dtype=np.uint8, count=len(predictions))
+    return {
+        "format": TIMELINE_FORMAT,
+        "start": start_seconds,
+        "hop": hop_seconds,
+        "count": len(predictions),
+        "confidence": _b64(np.asarray(confidences, dtype="<f2")),
+        "predictions": _b64(np.packbits(is_ai)),
+        "segments": run_length_segments(is_ai)
+    }
+
+
+def decode_timeline(timeline: Dict, limit: Optional[int] = None) -> List[Dict]:
+    """Expand a compact timeline back to the [{'timestamp', 'confidence', 'prediction'}, ...] shape"""
+    count = timeline["count"] if limit is None else min(limit, timeline["count"])
+    confidences = np.frombuffer(base64.b64decode(timeline["confidence"]), dtype="<f2")[:count]
+    is_ai = np.unpackbits(np.frombuffer(base64.b64decode(timeline["predictions"]), dtype=np.uint8))[:count]
+    start, hop = timeline["start"], timeline["hop"]
+    return [
+        {
+            "timestamp": start + i * hop,
+            "confidence": round(float(confidences[i]), 4),
+            "prediction": "AI" if is_ai[i] else "Human"
+        }
+        for i in range(count)
+    ]
+
+
+def job_timeline(job: Dict, limit: Optional[int] = None) -> List[Dict]:
+    """Timeline items of a report job, whether it stores the compact form or the legacy inline list"""
+    if job.get("timeline"):
+        return decode_timeline(job["timeline"], limit)
+    items = [item for item in job.get("result") or [] if "timestamp" in item]
+    return items if limit is None else items[:limit]
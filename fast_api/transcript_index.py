@@ -0,0 +1,132 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Deepgram utterances are absent from older stored jobs; words separated by a longer gap start a new one
+UTTERANCE_GAP_SECONDS = 1.0
+
+
+def window_ai_probabilities(timeline: Sequence[Dict], hop_seconds: float = 3) -> List[Tuple[float, float, float]]:
+    """(start, end, P(AI)) per detector window; confidence is for the predicted label, so flip it for Human"""
+    return [
+        (item["timestamp"], item["timestamp"] + hop_seconds,
+         item["confidence"] if item["prediction"] == "AI" else 1 - item["confidence"])
+        for item in timeline
+    ]
+
+
+def overlap_scores(intervals: Sequence[Tuple[float, float]], windows: Sequence[Tuple[float, float, float]]) -> List[Optional[float]]:
+    """
+    Overlap-weighted P(AI) for each (start, end) interval. Both inputs must be sorted by start; one sweep
+    keeps a window pointer that only moves forward, so the cost is O(n + m + total overlaps).
+    Intervals that touch no window (e.g. past the end of the audio) get None.
+    """
+    scores = []
+    first = 0
+    for start, end in intervals:
+        end = max(end, start + 1e-3)
+        while first < len(windows) and windows[first][1] <= start:
+            first += 1
+        weight = 0.0
+        total = 0.0
+        w = first
+        while w < len(windows) and windows[w][0] < end:
+            overlap = min(end, windows[w][1]) - max(start, windows[w][0])
+            if overlap > 0:
+                weight += overlap
+                total += overlap * windows[w][2]
+            w += 1
+        scores.append(round(total / weight, 4) if weight else None)
+    return scores
+
+
+def utterance_spans(transcription: Dict) -> List[Dict]:
+    if transcription.get("utterances"):
+        return transcription["utterances"]
+    utterances = []
+    for word in transcription.get("words", []):
+        if utterances and word["start"] - utterances[-1]["end"] <= UTTERANCE_GAP_SECONDS:
+            utterances[-1]["end"] = word["end"]
+            utterances[-1]["transcript"] += " " + word["word"]
+        else:
+            utterances.append({"start": word["start"], "end": word["end"], "transcript": word["word"]})
+    return utterances
+
+
+def build_attribution(transcription: Optional[Dict], timeline: Sequence[Dict], hop_seconds: float = 3) -> Optional[Dict]:
+    """
+    Per-word and per-utterance AI likelihood for a report. word_ai_probability is aligned with
+    transcription['words'] by index.
+    """
+    if not transcription or not transcription.get("words"):
+        return None
+    windows = window_ai_probabilities(timeline, hop_seconds)
+    words = transcription["words"]
+    order = sorted(range(len(words)), key=lambda i: words[i]["start"])
+    sorted_scores = overlap_scores([(words[i]["start"], words[i]["end"]) for i in order], windows)
+    word_scores = [None] * len(words)
+    for i, score in zip(order, sorted_scores):
+        word_scores[i] = score
+
+    utterances = sorted(utterance_spans(transcription), key=lambda u: u["start"])
+    utterance_scores = overlap_scores([(u["start"], u["end"]) for u in utterances], windows)
+    return {
+        "word_ai_probability": word_scores,
+        "utterances": [
+            {**utterance, "ai_probability": score}
+            for utterance, score in zip(utterances, utterance_scores)
+        ]
+    }
+
+
+class TranscriptIndex:
+    """Sorted start/end arrays over a report's windows, words and utterances for time-range queries"""
+
+    def __init__(self, timeline: Sequence[Dict], transcription: Optional[Dict], attribution: Optional[Dict],
+                 hop_seconds: float = 3):
+        self.hop_seconds = hop_seconds
+        self.timeline = list(timeline)
+        words = (transcription or {}).get("words", [])
+        word_scores = (attribution or {}).get("word_ai_probability") or [None] * len(words)
+        self.words = sorted(
+            ({**word, "ai_probability": score} for word, score in zip(words, word_scores)),
+            key=lambda w: w["start"]
+        )
+        self.word_starts = [w["start"] for w in self.words]
+        self.utterances = (attribution or {}).get("utterances", [])
+        self.utterance_starts = [u["start"] for u in self.utterances]
+        # Utterances can be long, so a start-sorted search alone would miss ones that began before t1
+        self.longest_utterance = max((u["end"] - u["start"] for u in self.utterances), default=0)
+        self.longest_word = max((w["end"] - w["start"] for w in self.words), default=0)
+
+    def query(self, t1: float, t2: float) -> Dict:
+        first_window = max(0, int(t1 // self.hop_seconds))
+        last_window = min(len(self.timeline), int(-(-t2 // self.hop_seconds)))
+        lo = bisect_left(self.word_starts, t1 - self.longest_word)
+        hi = bisect_right(self.word_starts, t2)
+        u_lo = bisect_left(self.utterance_starts, t1 - self.longest_utterance)
+        u_hi = bisect_right(self.utterance_starts, t2)
+        return {
+            "start": t1,
+            "end": t2,
+            "timeline": self.timeline[first_window:last_window],
+            "words": [w for w in self.words[lo:hi] if w["end"] > t1 and w["start"] < t2],
+            "utterances": [u for u in self.utterances[u_lo:u_hi] if u["end"] > t1 and u["start"] < t2]
+        }
+
+
+def limit_utterance_text(utterances: Sequence[Dict], max_chars: int) -> List[Dict]:
+    """
+    Copies of the utterances for a limited preview: transcripts share a max_chars budget and are clipped
+    with '...', and per-utterance word lists (which repeat the full text) are dropped.
+    """
+    limited = []
+    remaining = max_chars
+    for utterance in utterances:
+        text = utterance.get("transcript") or ""
+        if len(text) > remaining:
+            text = text[:remaining] + "..."
+            remaining = 0
+        else:
+            remaining -= len(text)
+        limited.append({**{k: v for k, v in utterance.items() if k != "words"}, "transcript": text})
+    return limited